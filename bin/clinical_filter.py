@@ -20,9 +20,11 @@ CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 '''
 
 import logging
+import sys
 
 from clinicalfilter.load_options import get_options
 from clinicalfilter.filter import Filter
+from clinicalfilter.parallel import run_families, run_pipeline
 from clinicalfilter.ped import load_families, Family
 
 def get_families(args):
@@ -62,12 +64,35 @@ def main():
     families = get_families(args)
     count = sum([ y.is_affected() for x in families for y in x.children ])
     
-    finder = Filter(args.populations, count, args.known_genes, args.genes_date, 
-                    args.regions, args.lof_sites, args.pp_filter, args.sum_x_lr2_file, args.output, 
-                    args.export_vcf, args.debug_chrom, args.debug_pos)
+    options = {'population_tags': args.populations, 'count': count,
+        'known_genes': args.known_genes, 'date': args.genes_date,
+        'regions': args.regions, 'lof_sites': args.lof_sites,
+        'pp_filter': args.pp_filter, 'sum_x_lr2_file': args.sum_x_lr2_file,
+        'output_path': args.output, 'export_vcf': args.export_vcf,
+        'debug_chrom': args.debug_chrom, 'debug_pos': args.debug_pos,
+        'site_annotations': args.site_annotations,
+        'annotation_cache_size': args.annotation_cache_size,
+        'site_filter': args.site_filter, 'panel': args.panel}
     
-    for family in families:
-        finder.filter_trio(family)
+    finder = Filter(**options)
+    
+    if args.workers is None:
+        for family in families:
+            finder.filter_trio(family)
+        return
+    
+    if args.readers is not None:
+        failed = run_pipeline(finder, families, options, args.workers,
+            args.readers)
+    else:
+        failed = run_families(finder, families, options, args.workers)
+    if len(failed) > 0:
+        sys.stderr.write('{} of {} families failed:\n'.format(len(failed),
+            len(families)))
+        for family_id, error in failed:
+            sys.stderr.write('{}\t{}\n'.format(family_id,
+                error.strip().split('\n')[-1]))
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
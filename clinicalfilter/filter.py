@@ -27,6 +27,11 @@ from clinicalfilter.post_inheritance_filter import PostInheritanceFilter
 from clinicalfilter.reporting import Report
 from clinicalfilter.load_files import open_known_genes, open_cnv_regions, \
     open_last_base_sites, open_x_lr2_file
+from clinicalfilter.site_annotations import open_site_annotations
+from clinicalfilter.site_filter import open_site_filter
+from clinicalfilter.gene_intervals import GeneIntervals
+from clinicalfilter.panel import open_panel
+from clinicalfilter.variant.annotation_cache import AnnotationCache
 
 class Filter(object):
     """ filters trios for candidate variants that might contribute to a
@@ -35,7 +40,9 @@ class Filter(object):
     
     def __init__(self, population_tags=None, count=0, known_genes=None, date=None,
             regions=None, lof_sites=None, pp_filter=0.0, sum_x_lr2_file=None,
-            output_path=None, export_vcf=None, debug_chrom=None, debug_pos=None):
+            output_path=None, export_vcf=None, debug_chrom=None, debug_pos=None,
+            site_annotations=None, annotation_cache_size=0, site_filter=None,
+            panel=None):
         """ initialise the class object
         
         Args:
@@ -58,6 +65,16 @@ class Filter(object):
             export_vcf: path to file or folder to write VCFs to.
             debug_chrom: chromosome for debugging purposes.
             debug_pos: position for debugging variant filtering at.
+            site_annotations: path to index of precomputed site annotations
+                for the cohort, or None.
+            annotation_cache_size: number of sites to hold parsed INFO
+                annotations for, so sites recurring across families are only
+                parsed once. Zero disables the cache.
+            site_filter: path to filter of cohort sites which could pass the
+                site-level filters, or None.
+            panel: path to gene list or BED file to restrict the analysis to,
+                or None. Only the panel regions are read from the VCFs, which
+                need to be tabix-indexed.
         """
         
         self.pp_filter = pp_filter
@@ -71,7 +88,28 @@ class Filter(object):
         # open reference datasets, these return None if the paths are None
         self.known_genes = open_known_genes(known_genes)
         self.cnv_regions = open_cnv_regions(regions)
+        
+        self.panel = open_panel(panel, self.known_genes)
+        self.regions = None
+        if self.panel is not None:
+            self.known_genes = self.panel.restrict_genes(self.known_genes)
+            self.regions = self.panel.regions
+        
+        # only variants within known genes can pass, so we can skip proband
+        # lines outside the gene spans by position alone
+        self.gene_intervals = None
+        if self.known_genes is not None:
+            self.gene_intervals = GeneIntervals(self.known_genes)
+
         self.last_base = open_last_base_sites(lof_sites)
+        self.sites = open_site_annotations(site_annotations, population_tags,
+            lof_sites)
+        self.site_filter = open_site_filter(site_filter, known_genes,
+            population_tags, lof_sites)
+        
+        self.annotation_cache = None
+        if annotation_cache_size > 0:
+            self.annotation_cache = AnnotationCache(annotation_cache_size)
 
         #open file containing sum of mean log 2 ratios on X, returns an empty dict if path is None
         self.sum_x_lr2 = open_x_lr2_file(sum_x_lr2_file)
@@ -87,16 +125,76 @@ class Filter(object):
         family.set_child()
         while family.child is not None:
             if family.child.is_affected():
-                self.count += 1
-                logging.info("opening trio {} of {}".format(self.count, self.total))
-                
-                found_vars = self.analyse_trio(family)
+                found_vars = self.analyse_child(family)
                 # export the results to either tab-separated table or VCF format
                 self.reporter.export_data(found_vars, family)
             
             family.set_child_examined()
     
-    def analyse_trio(self, family):
+    def analyse_family(self, family, sources=None):
+        """ screens each affected child in a family, without exporting.
+        
+        This splits the analysis from the export, so families can be analysed
+        in other processes, and exported by the main process.
+        
+        Args:
+            family: Family object
+            sources: dictionary of VCF text (after the header) indexed by VCF
+                path, for VCFs that have already been read, or None.
+        
+        Returns:
+            list of candidate variant lists (as from analyse_trio()), one for
+            each affected child, in the order of the children in the family.
+        """
+        
+        results = []
+        family.set_child()
+        while family.child is not None:
+            if family.child.is_affected():
+                results.append(self.analyse_child(family, sources))
+            
+            family.set_child_examined()
+        
+        return results
+    
+    def export_family(self, family, results):
+        """ export the candidate variants for each affected child in a family
+        
+        Args:
+            family: Family object, with the children not yet examined.
+            results: list of candidate variant lists, as from analyse_family()
+        """
+        
+        results = list(results)
+        family.set_child()
+        while family.child is not None:
+            if family.child.is_affected():
+                self.reporter.export_data(results.pop(0), family)
+            
+            family.set_child_examined()
+    
+    def analyse_child(self, family, sources=None):
+        """ analyse the current child in a family, with logging of progress
+        
+        Args:
+            family: Family object, with the child to be analysed set.
+            sources: dictionary of VCF text indexed by VCF path, or None.
+        
+        Returns:
+            list of candidate variants, as from analyse_trio()
+        """
+        
+        self.count += 1
+        logging.info("opening trio {} of {}".format(self.count, self.total))
+        
+        found_vars = self.analyse_trio(family, sources)
+        
+        if self.annotation_cache is not None:
+            logging.info(self.annotation_cache.stats())
+        
+        return found_vars
+    
+    def analyse_trio(self, family, sources=None):
         """identify candidate variants in exome data for a single trio.
         
         takes variants that passed the initial filtering from VCF loading, and
@@ -107,6 +205,8 @@ class Filter(object):
         
         Args:
             family: Family object
+            sources: dictionary of VCF text (after the header) indexed by VCF
+                path, for VCFs that have already been read, or None.
         
         Returns:
             list of (TrioGenotype, [genes], [inheritances], [type]) tuples for
@@ -114,7 +214,9 @@ class Filter(object):
         """
         
         variants = load_variants(family, self.pp_filter, self.populations,
-            self.known_genes, self.last_base, self.sum_x_lr2, self.debug_chrom, self.debug_pos)
+            self.known_genes, self.last_base, self.sum_x_lr2, self.debug_chrom,
+            self.debug_pos, self.sites, self.annotation_cache, self.site_filter,
+            self.gene_intervals, self.regions, sources)
         
         # organise variants by gene, then find variants that fit different
         # inheritance models. We have to flatten the list of variant lists
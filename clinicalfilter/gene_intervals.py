@@ -0,0 +1,134 @@
+'''
+Copyright (c) 2017 Genome Research Ltd.
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of
+this software and associated documentation files (the "Software"), to deal in
+the Software without restriction, including without limitation the rights to
+use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies
+of the Software, and to permit persons to whom the Software is furnished to do
+so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+'''
+
+
+import bisect
+
+def _strip_chrom(chrom):
+    ''' drop any 'chr' prefix, so gene tables and VCFs can use either style
+    '''
+    
+    if chrom.lower().startswith('chr'):
+        chrom = chrom[3:]
+    
+    return chrom
+
+class GeneIntervals(object):
+    ''' cursor over sorted, merged known gene spans.
+    
+    Only variants within known genes can pass when a known genes list is in
+    use, so we can skip VCF lines outside every gene span using the chrom and
+    position alone, without splitting the INFO field. The cursor moves forward
+    along the intervals as positions increase, which matches reading a sorted
+    VCF. If the position moves backwards (or the VCF is unsorted), we fall back
+    to a binary search.
+    '''
+    
+    def __init__(self, known_genes, flank=0):
+        ''' initialise the intervals
+        
+        Args:
+            known_genes: dictionary of genes, indexed by HGNC ID, where each
+                entry has 'chrom', 'start' and 'end' values.
+            flank: number of bases to pad each gene span by.
+        '''
+        
+        spans = {}
+        for gene in known_genes.values():
+            chrom = _strip_chrom(gene['chrom'])
+            start, end = sorted([gene['start'], gene['end']])
+            if chrom not in spans:
+                spans[chrom] = []
+            spans[chrom].append((start - flank, end + flank))
+        
+        self.starts = {}
+        self.ends = {}
+        for chrom in spans:
+            merged = []
+            for start, end in sorted(spans[chrom]):
+                if len(merged) > 0 and start <= merged[-1][1] + 1:
+                    merged[-1][1] = max(merged[-1][1], end)
+                else:
+                    merged.append([start, end])
+            
+            self.starts[chrom] = [ x[0] for x in merged ]
+            self.ends[chrom] = [ x[1] for x in merged ]
+        
+        self.reset()
+    
+    def __len__(self):
+        return sum([ len(x) for x in self.starts.values() ])
+    
+    def reset(self):
+        ''' move the cursor back to the start, ready for another VCF
+        '''
+        
+        self.chrom = None
+        self.starts_here = []
+        self.ends_here = []
+        self.pos = None
+        self.idx = 0
+    
+    def contains(self, chrom, pos):
+        ''' check if a site falls within any gene span
+        
+        Args:
+            chrom: chromosome string, with or without a 'chr' prefix
+            pos: nucleotide position, as int
+        
+        Returns:
+            True/False for whether the site is within a gene span
+        '''
+        
+        if chrom != self.chrom:
+            self.chrom = chrom
+            self.starts_here = self.starts.get(_strip_chrom(chrom), [])
+            self.ends_here = self.ends.get(_strip_chrom(chrom), [])
+            self.pos = None
+        
+        ends = self.ends_here
+        if self.pos is None or pos < self.pos:
+            self.idx = bisect.bisect_left(ends, pos)
+        
+        self.pos = pos
+        while self.idx < len(ends) and ends[self.idx] < pos:
+            self.idx += 1
+        
+        return self.idx < len(ends) and self.starts_here[self.idx] <= pos
+    
+    def might_pass(self, line):
+        ''' check if a VCF line could be within a known gene, before parsing
+        
+        CNVs can span or overlap genes from outside, so those are checked
+        separately, and always pass here.
+        
+        Args:
+            line: unsplit VCF line
+        
+        Returns:
+            True/False for whether the line should be parsed
+        '''
+        
+        chrom, pos, _, _, alt, _ = line.split('\t', 5)
+        if alt in ['<DUP>', '<DEL>']:
+            return True
+        
+        return self.contains(chrom, int(pos))
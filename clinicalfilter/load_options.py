@@ -75,6 +75,33 @@ def get_options():
         help="Comma separated list of population tags that can exist in the "
             "INFO field for population-specific minor allele frequencies")
 
+    parser.add_argument("--site-annotations",
+        help="Path to index of site annotations for the cohort, as built by "
+            "scripts/build_site_annotations.py. Used to skip sites which "
+            "cannot pass the filters without parsing their INFO.")
+    
+    parser.add_argument("--site-filter",
+        help="Path to filter of cohort sites which could pass the site-level "
+            "filters, as built by scripts/build_site_filter.py. Must be built "
+            "with the same known genes, populations and last base sites.")
+    parser.add_argument("--annotation-cache-size", type=int, default=0,
+        help="Number of sites to keep parsed INFO annotations for, so sites "
+            "recurring across families are only parsed once (default=0, no "
+            "caching).")
+    parser.add_argument("--panel",
+        help="Path to gene list (HGNC IDs or symbols, one per line) or BED "
+            "file of regions to restrict the analysis to. Only the panel "
+            "regions are read from the VCFs, which must be bgzipped and "
+            "tabix-indexed. Gene lists need --known-genes for coordinates.")
+    parser.add_argument("--workers", type=int,
+        help="Number of processes to analyse families in parallel. Output is "
+            "written in the same order as the PED file, and families that "
+            "fail are reported at the end, rather than stopping the run.")
+    parser.add_argument("--readers", type=int,
+        help="Number of threads to read and decompress VCFs ahead of the "
+            "--workers processes. This runs a pipeline of readers, workers "
+            "and a single writer, and logs how busy each stage was.")
+    
     #new argument added by re3 to require a file of sums of log2 ratio on X chromosome for CNV filtering
     parser.add_argument("--sum_x_lr2_file", help="Path to file containing the sum of lr2 on x chromosome for each sample")
     
@@ -83,6 +110,15 @@ def get_options():
     if args.pp_filter < 0.0 or args.pp_filter > 1:
         parser.error("--pp-dnm-threshold must be between 0 and 1")
     
+    if args.annotation_cache_size < 0:
+        parser.error("--annotation-cache-size cannot be negative")
+    
+    if args.workers is not None and args.workers < 1:
+        parser.error("--workers must be at least 1")
+    
+    if args.readers is not None and (args.readers < 1 or args.workers is None):
+        parser.error("--readers must be at least 1, and needs --workers")
+    
     if args.child is not None:
         if args.father is not None and args.dad_aff is None:
             parser.error("--dad-aff must also be used if --father is used")
@@ -19,6 +19,7 @@ IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
 CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 '''
 
+import io
 import logging
 
 from clinicalfilter.variant.info import Info
@@ -27,11 +28,12 @@ from clinicalfilter.variant.snv import SNV
 from clinicalfilter.variant.cnv import CNV
 from clinicalfilter.trio_genotypes import TrioGenotypes
 from clinicalfilter.utils import open_vcf, get_vcf_header, exclude_header, \
-    construct_variant
-from clinicalfilter.multinucleotide_variants import get_mnv_candidates
+    construct_variant, fetch_regions
+from clinicalfilter.multinucleotide_variants import scan_mnvs
 
 def load_variants(family, pp_filter, pops, known_genes, last_base, sum_x_lr2,
-        debug_chrom=None, debug_pos=None):
+        debug_chrom=None, debug_pos=None, sites=None, cache=None,
+        site_filter=None, gene_intervals=None, regions=None, sources=None):
     """ loads the variants for a trio or singleton
     
     Args:
@@ -46,6 +48,19 @@ def load_variants(family, pp_filter, pops, known_genes, last_base, sum_x_lr2,
         debug_pos: chromosome position, to give more information about why
             a variant fails to pass the filters.
         sum_x_lr2: Sum of mean l2r on x chromosomes for all probands
+        sites: dictionary of SiteAnnotations indexed by (chrom, pos, ref, alt),
+            or None. Used to skip proband sites that cannot pass the filters.
+        cache: AnnotationCache to share parsed INFO annotations between
+            families, or None.
+        site_filter: SiteFilter of cohort sites that could pass the site
+            filters, or None. Proband lines not in the filter are skipped
+            before parsing.
+        gene_intervals: GeneIntervals for the known genes, or None. Proband
+            lines outside every known gene span are skipped before parsing.
+        regions: list of (chrom, start, end) tuples for a gene panel, or None.
+            If used, only these regions are read from the tabix-indexed VCFs.
+        sources: dictionary of VCF text (after the header) indexed by VCF
+            path, for VCFs that have already been read, or None.
     
     Returns:
         list of filtered variants for a trio, as TrioGenotypes objects
@@ -58,6 +73,7 @@ def load_variants(family, pp_filter, pops, known_genes, last_base, sum_x_lr2,
         Var.set_known_genes(known_genes)
         Var.set_debug(debug_chrom, debug_pos)
     
+    Info.set_cache(cache)
     Info.set_last_base_sites(last_base)
     Info.set_populations(pops)
 
@@ -66,11 +82,13 @@ def load_variants(family, pp_filter, pops, known_genes, last_base, sum_x_lr2,
     if family.child.person_id in sum_x_lr2.keys():
         sum_x_lr2_proband = sum_x_lr2[family.child.person_id]
     
-    variants = load_trio(family, sum_x_lr2_proband)
+    variants = load_trio(family, sum_x_lr2_proband, sites, site_filter,
+        gene_intervals, regions, sources)
     
     return filter_de_novos(variants, pp_filter)
     
-def include_variant(line, child_variants, gender, mnvs, sum_x_lr2, parents):
+def include_variant(line, child_variants, gender, mnvs, sum_x_lr2, parents,
+        sites=None):
     """ check if we want to include the variant or not
     
     Args:
@@ -83,6 +101,8 @@ def include_variant(line, child_variants, gender, mnvs, sum_x_lr2, parents):
             multinucleotide variant sites  within the proband.
         sum_x_lr2: SUm of mean lr2 on x chromosome for proband.
         parents: does trio have parents?
+        sites: dictionary of SiteAnnotations indexed by (chrom, pos, ref, alt),
+            or None.
     
     Returns:
         True/False for whether to include the variant.
@@ -92,10 +112,20 @@ def include_variant(line, child_variants, gender, mnvs, sum_x_lr2, parents):
         key = (line[0], int(line[1]))
         return key in child_variants
     
+    # check the precomputed site annotation, so we can skip parsing the INFO
+    # for sites that cannot pass. MNV candidates can alter the consequence, so
+    # those sites need the full check.
+    if sites is not None and (mnvs is None or (line[0], int(line[1])) not in mnvs):
+        site = sites.get((line[0], int(line[1]), line[3], line[4]))
+        if site is not None and not site.can_pass(SNV.known_genes):
+            return False
+    
     var = construct_variant(line, gender, mnvs, sum_x_lr2, parents)
     return var.passes_filters()
     
-def open_individual(individual, child_variants=None, mnvs=None, sum_x_lr2=None, parents=None):
+def open_individual(individual, child_variants=None, mnvs=None, sum_x_lr2=None,
+        parents=None, sites=None, site_filter=None, gene_intervals=None,
+        regions=None, find_mnvs=False, sources=None):
     """ Convert VCF to TSV format. Use for single sample VCF file.
     
     Obtains the VCF data for a single sample. This function optionally
@@ -107,9 +137,20 @@ def open_individual(individual, child_variants=None, mnvs=None, sum_x_lr2=None,
         child_variants: True/False for whether variants have been filtered
             for the proband (if so, we can simply check the parent's
             variants for matches in the child's variants).
-        mnvs: dictionary
+        mnvs: dictionary of MNV codes, indexed by (chrom, pos) tuples.
         sum_x_lr2: Sum of mean lr2 for proband X chromosome for filtering CNVs
         parents: does the family have both parents?
+        sites: dictionary of SiteAnnotations indexed by (chrom, pos, ref, alt),
+            or None.
+        site_filter: SiteFilter to check lines against before parsing, or None.
+        gene_intervals: GeneIntervals to check line positions against before
+            parsing, or None.
+        regions: list of (chrom, start, end) tuples to read from a tabix
+            indexed VCF, or None to read the full VCF.
+        find_mnvs: whether to find MNV candidates while reading the VCF. If
+            so, the mnvs dictionary is filled in as we go.
+        sources: dictionary of VCF text (after the header) indexed by VCF
+            path, or None. VCFs in the dictionary are read from memory.
     
     Returns:
         A list of variants for the individual.
@@ -125,17 +166,39 @@ def open_individual(individual, child_variants=None, mnvs=None, sum_x_lr2=None,
     gender = individual.get_gender()
     
     # open the vcf, and adjust the position in the file to immediately after
-    # the header, so we can run through the variants
-    vcf = open_vcf(path)
-    exclude_header(vcf)
+    # the header, so we can run through the variants. For panels, we only
+    # read the panel regions.
+    if sources is not None and path in sources:
+        vcf = io.StringIO(sources[path])
+    elif regions is not None:
+        vcf = fetch_regions(path, regions)
+    else:
+        vcf = open_vcf(path)
+        exclude_header(vcf)
+    
+    if gene_intervals is not None:
+        gene_intervals.reset()
+    
+    # MNV candidates are found in a sliding window as we read the VCF, so we
+    # don't need to read the VCF twice
+    lines = vcf
+    if find_mnvs:
+        lines = scan_mnvs(vcf, mnvs, path)
     
     variants = []
-    for line in vcf:
+    for line in lines:
+        if gene_intervals is not None and not gene_intervals.might_pass(line):
+            continue
+        
+        if site_filter is not None and not site_filter.might_pass(line, mnvs):
+            continue
+        
         line = line.strip().split("\t")
         
         try:
             # check if we want to include the variant or not
-            if include_variant(line, child_variants, gender, mnvs, sum_x_lr2, parents):
+            if include_variant(line, child_variants, gender, mnvs, sum_x_lr2,
+                    parents, sites):
                 var = construct_variant(line, gender, mnvs, sum_x_lr2, parents)
                 var.add_vcf_line(line)
                 variants.append(var)
@@ -150,7 +213,8 @@ def open_individual(individual, child_variants=None, mnvs=None, sum_x_lr2=None,
     
     return variants
 
-def load_trio(family, sum_x_lr2_proband):
+def load_trio(family, sum_x_lr2_proband, sites=None, site_filter=None,
+        gene_intervals=None, regions=None, sources=None):
     """ opens and parses the VCF files for members of the family trio.
     
     We need to load the VCF data for each of the members of the trio. As a
@@ -160,17 +224,23 @@ def load_trio(family, sum_x_lr2_proband):
     We also need the sum of mean lr2 ratios on the X chromosome for the proband
     """
     
-    mnvs = get_mnv_candidates(family.child.get_path())
+    # the MNV candidates are filled in while scanning the childs VCF
+    mnvs = {}
     
     # open the childs VCF file, and get the variant keys, to check if they
     # are in the parents VCF
     parents = family.has_parents()
 
-    child = open_individual(family.child, mnvs=mnvs, sum_x_lr2=sum_x_lr2_proband, parents=parents)
+    child = open_individual(family.child, mnvs=mnvs, sum_x_lr2=sum_x_lr2_proband,
+        parents=parents, sites=sites, site_filter=site_filter,
+        gene_intervals=gene_intervals, regions=regions, find_mnvs=True,
+        sources=sources)
     keys = set([var.get_key() for var in child])
     
-    mother = open_individual(family.mother, child_variants=keys)
-    father = open_individual(family.father, child_variants=keys)
+    mother = open_individual(family.mother, child_variants=keys,
+        regions=regions, sources=sources)
+    father = open_individual(family.father, child_variants=keys,
+        regions=regions, sources=sources)
     
     return combine_trio_variants(family, child, mother, father)
 
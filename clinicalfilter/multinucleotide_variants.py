@@ -19,12 +19,11 @@ IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
 CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 '''
 
+import os
 import re
-from collections import namedtuple
+from collections import namedtuple, deque
 
-import tabix
-
-from clinicalfilter.utils import open_vcf, exclude_header, get_vcf_header
+from clinicalfilter.utils import open_vcf, exclude_header, fetch_regions
 
 coding_cq = set(["transcript_ablation", "splice_donor_variant",
     "splice_acceptor_variant", "stop_gained", "frameshift_variant",
@@ -52,43 +51,146 @@ AA_CODE = {"AAA": "K", "AAC": "N", "AAG": "K", "AAT": "N",
     "TGA": "*", "TGC": "C", "TGG": "W", "TGT": "C",
     "TTA": "L", "TTC": "F", "TTG": "L", "TTT": "F"}
 
-def get_mnv_candidates(path):
+def get_mnv_candidates(path, regions=None):
     ''' identify MNV candidates, and their MNV consequences within a VCF.
     
+    This works from a window of adjacent lines, so any VCF that open_vcf()
+    accepts can be used. We only use tabix for panel regions, where reading
+    a few regions is cheaper than reading the full VCF.
+    
     Args:
         path: path to VCF
+        regions: list of (chrom, start, end) tuples to restrict the search to,
+            or None to check the full VCF.
     
     Returns:
-        list of (variant, mnv_consequence) tuples, where variant is (chrom, pos)
+        dictionary of MNV consequences, indexed by (chrom, pos) tuples
     '''
     
-    with open_vcf(path) as vcf:
-        exclude_header(vcf)
-        header = get_vcf_header(vcf)
-        pairs = find_nearby_variants(vcf)
+    candidates = {}
+    if regions is not None and os.path.exists(path + '.tbi'):
+        for line in scan_mnvs(fetch_regions(path, regions), candidates, path):
+            pass
+    else:
+        with open_vcf(path) as vcf:
+            exclude_header(vcf)
+            for line in scan_mnvs(vcf, candidates, path):
+                pass
+    
+    return candidates
+
+def scan_mnvs(lines, mnvs, path=None, threshold=2):
+    ''' find MNV candidates within a sliding window over a VCF stream.
+    
+    This lets us find MNVs while reading the VCF for the main scan, rather
+    than reading the VCF once for nearby variants, then pulling the pairs out
+    again with tabix. Only lines in nearby pairs are parsed, and each is only
+    parsed once. Lines are yielded once no later line can pair with them, at
+    which point the MNV code (if any) for the line is in the mnvs dictionary.
+    
+    Args:
+        lines: iterable of VCF lines, after the header, sorted by position.
+        mnvs: dictionary to add MNV codes to, indexed by (chrom, pos) tuples.
+        path: path to the VCF, for reporting odd pairs.
+        threshold: distance in base-pairs for variants to be nearby.
     
-    # ensure variants are not indels, are coding, and pairs alter the same amino
-    # acid position
-    vcf = tabix.open(path)
-    pairs = screen_pairs(vcf, pairs, is_not_indel)
-    pairs = screen_pairs(vcf, pairs, is_coding)
-    pairs = same_aa(vcf, pairs)
+    Yields:
+        VCF lines (as strings), in the same order as the input.
+    '''
     
+    Variant = namedtuple('Variant', ['chrom', 'pos', 'id', 'ref', 'alts', 'qual',
+        'filter', 'info'])
     pattern = re.compile('[ACGT]')
     
-    candidates = {}
-    for pair in pairs:
-        var1, var2 = list(get_matches(vcf, pair))
-        try:
-            cq = check_mnv_consequence(var1, var2, pattern)
-            candidates[pair[0]] = cq
-            candidates[pair[1]] = cq
-        except AssertionError:
-            print('{0}:{1} and {0}:{2} in {3} have multiple alternative ' \
-                'transcripts or odd codon sequences'.format(var1.chrom,
-                var1.pos, var2.pos, path))
+    # window of [chrom, pos, line, parsed] entries, and the nearby pairs which
+    # are waiting on later lines at the same position as the second partner
+    window = deque()
+    pending = deque()
     
-    return candidates
+    previous = ('0', -10000)
+    for line in lines:
+        chrom, pos, _ = line.split('\t', 2)
+        pos = int(pos)
+        
+        while len(pending) > 0 and (pending[0][1][0] != chrom or \
+                max(pending[0][0][1], pending[0][1][1]) < pos):
+            check_pair(pending.popleft(), window, mnvs, Variant, pattern, path)
+        
+        while len(window) > 0 and (window[0][0] != chrom or \
+                window[0][1] + threshold < pos):
+            yield window.popleft()[2]
+        
+        # as in find_nearby_variants(), only check against the previous line
+        if chrom == previous[0]:
+            delta = abs(previous[1] - pos)
+            if delta <= threshold and previous[1] != pos:
+                pending.append([previous, (chrom, pos)])
+        
+        previous = (chrom, pos)
+        window.append([chrom, pos, line, None])
+    
+    while len(pending) > 0:
+        check_pair(pending.popleft(), window, mnvs, Variant, pattern, path)
+    
+    while len(window) > 0:
+        yield window.popleft()[2]
+
+def check_pair(pair, window, mnvs, Variant, pattern, path=None):
+    ''' check if a nearby pair is an MNV, using the lines in the window
+    
+    This applies the same checks as get_mnv_candidates(), but to lines held
+    in memory, rather than lines pulled out with tabix.
+    
+    Args:
+        pair: list of (chrom, pos) tuples for the nearby variants
+        window: deque of [chrom, pos, line, parsed] entries. The parsed
+            entries are filled in as lines are needed.
+        mnvs: dictionary to add MNV codes to, indexed by (chrom, pos) tuples.
+        Variant: namedtuple for parsed VCF lines
+        pattern: compiled regex pattern for uppercases bases
+        path: path to the VCF, for reporting odd pairs.
+    '''
+    
+    chrom = pair[0][0]
+    positions = set([ x[1] for x in pair ])
+    
+    matches = []
+    for entry in window:
+        if entry[0] == chrom and entry[1] in positions:
+            if entry[3] is None:
+                entry[3] = parse_vcf_line(entry[2].split('\t'), Variant)
+            matches.append(entry[3])
+    
+    if len(matches) != 2:
+        print('>2 MNV candidates: {}, found in {}'.format(pair, path))
+        return
+    
+    if not all([ is_not_indel(x) for x in matches ]):
+        return
+    
+    if not all([ is_coding(x) for x in matches ]):
+        return
+    
+    # splice_region variants can be outside CDS, make these fail
+    aa = []
+    for var in matches:
+        if 'Protein_position' not in var.info:
+            aa += [1, 2]
+        else:
+            aa.append(var.info['Protein_position'])
+    
+    if len(set(aa)) != 1:
+        return
+    
+    var1, var2 = matches
+    try:
+        cq = check_mnv_consequence(var1, var2, pattern)
+        mnvs[pair[0]] = cq
+        mnvs[pair[1]] = cq
+    except AssertionError:
+        print('{0}:{1} and {0}:{2} in {3} have multiple alternative ' \
+            'transcripts or odd codon sequences'.format(var1.chrom,
+            var1.pos, var2.pos, path))
 
 def find_nearby_variants(vcf, threshold=2):
     ''' find variants in close proximity, regardless of allele or consequence
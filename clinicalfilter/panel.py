@@ -0,0 +1,152 @@
+'''
+Copyright (c) 2017 Genome Research Ltd.
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of
+this software and associated documentation files (the "Software"), to deal in
+the Software without restriction, including without limitation the rights to
+use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies
+of the Software, and to permit persons to whom the Software is furnished to do
+so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+'''
+
+
+import io
+import logging
+
+class Panel(object):
+    ''' set of regions (and optionally genes) to restrict an analysis to.
+    
+    Panels let us reanalyse a handful of genes for a clinical query without
+    scanning the full VCFs, by reading only the panel regions from tabix
+    indexed VCFs.
+    '''
+    
+    def __init__(self, regions, genes=None):
+        ''' initialise the panel
+        
+        Args:
+            regions: list of (chrom, start, end) tuples, 1-based and inclusive.
+            genes: set of HGNC IDs for the panel genes, or None if the panel
+                was defined from a BED file.
+        '''
+        
+        self.regions = merge_regions(regions)
+        self.genes = genes
+    
+    def __len__(self):
+        return len(self.regions)
+    
+    def restrict_genes(self, known_genes):
+        ''' restrict the known genes to the panel genes
+        
+        Args:
+            known_genes: dictionary of known genes indexed by HGNC ID, or None
+        
+        Returns:
+            dictionary of known genes within the panel. This is unchanged if
+            the panel was defined from a BED file.
+        '''
+        
+        if known_genes is None or self.genes is None:
+            return known_genes
+        
+        return dict([ (x, known_genes[x]) for x in known_genes if x in self.genes ])
+
+def merge_regions(regions):
+    ''' sort and merge overlapping regions
+    
+    Args:
+        regions: list of (chrom, start, end) tuples
+    
+    Returns:
+        sorted list of (chrom, start, end) tuples, without overlaps.
+    '''
+    
+    merged = []
+    for chrom, start, end in sorted(regions):
+        if len(merged) > 0 and merged[-1][0] == chrom and start <= merged[-1][2] + 1:
+            merged[-1][2] = max(merged[-1][2], end)
+        else:
+            merged.append([chrom, start, end])
+    
+    return [ tuple(x) for x in merged ]
+
+def is_bed_line(line):
+    ''' check if a panel line looks like a BED region
+    '''
+    
+    return len(line) >= 3 and line[1].isdigit() and line[2].isdigit()
+
+def open_panel(path, known_genes=None):
+    ''' load the genes or regions to restrict the analysis to.
+    
+    The panel file is either a list of genes (one HGNC ID or HGNC symbol per
+    line), or a BED file of regions. Genes are converted to regions using the
+    coordinates from the known genes file.
+    
+    Args:
+        path: path to gene list or BED file.
+        known_genes: dictionary of known genes indexed by HGNC ID, or None.
+    
+    Returns:
+        Panel object, or None if the path is None.
+    '''
+    
+    if path is None:
+        return None
+    
+    regions = []
+    names = []
+    with io.open(path, 'r', encoding='latin_1') as handle:
+        for line in handle:
+            if line.startswith(('#', 'track', 'browser')) or line.strip() == '':
+                continue
+            
+            line = line.strip().split('\t')
+            if is_bed_line(line):
+                # BED files use 0-based, half-open coordinates
+                regions.append((line[0], int(line[1]) + 1, int(line[2])))
+            else:
+                names.append(line[0])
+    
+    if len(regions) > 0 and len(names) > 0:
+        raise ValueError("panel mixes BED regions and gene names: {}".format(path))
+    
+    if len(regions) > 0:
+        return Panel(regions)
+    
+    if known_genes is None:
+        raise ValueError("gene panels need a known genes file for gene coordinates")
+    
+    symbols = dict([ (known_genes[x]['symbol'], x) for x in known_genes ])
+    
+    genes = set()
+    missing = []
+    for name in names:
+        if name in known_genes:
+            genes.add(name)
+        elif name in symbols:
+            genes.add(symbols[name])
+        else:
+            missing.append(name)
+    
+    if len(missing) > 0:
+        logging.warning('panel genes not in known genes: {}'.format(', '.join(missing)))
+    
+    if len(genes) == 0:
+        raise ValueError("no panel genes found in the known genes: {}".format(path))
+    
+    regions = [ (known_genes[x]['chrom'], known_genes[x]['start'],
+        known_genes[x]['end']) for x in genes ]
+    
+    return Panel(regions, genes)
@@ -0,0 +1,301 @@
+'''
+Copyright (c) 2017 Genome Research Ltd.
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of
+this software and associated documentation files (the "Software"), to deal in
+the Software without restriction, including without limitation the rights to
+use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies
+of the Software, and to permit persons to whom the Software is furnished to do
+so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+'''
+
+
+import logging
+import multiprocessing
+import threading
+import time
+import traceback
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+from clinicalfilter.filter import Filter
+from clinicalfilter.utils import open_vcf, exclude_header
+
+# each worker process holds its own Filter, so the reference datasets are
+# only loaded once per worker, rather than once per family
+_finder = None
+
+def _init_worker(options):
+    ''' load the reference datasets for a worker process
+    
+    Args:
+        options: dictionary of arguments for Filter. Workers never write
+            output, so any output paths are dropped.
+    '''
+    
+    global _finder
+    
+    options = dict(options)
+    options['output_path'] = None
+    options['export_vcf'] = None
+    _finder = Filter(**options)
+
+def _analyse_family(family):
+    ''' analyse a family in a worker process
+    
+    Failures are caught, so one bad family doesn't abort the run.
+    
+    Args:
+        family: Family object
+    
+    Returns:
+        tuple of (results, error), where results is a list of candidate variant
+        lists for the affected children (or None if the analysis failed), and
+        error is the traceback string for a failure (or None).
+    '''
+    
+    try:
+        return _finder.analyse_family(family), None
+    except Exception:
+        error = traceback.format_exc()
+        logging.error('failed to analyse family {}:\n{}'.format(family.family_id,
+            error))
+        return None, error
+
+def _analyse_family_sources(index, family, sources):
+    ''' analyse a family in a worker process, from VCFs already read
+    
+    Args:
+        index: position of the family in the list of families
+        family: Family object
+        sources: dictionary of VCF text indexed by VCF path, or None
+    
+    Returns:
+        tuple of (index, results, error, seconds spent on the analysis)
+    '''
+    
+    start = time.time()
+    try:
+        results, error = _finder.analyse_family(family, sources), None
+    except Exception:
+        results, error = None, traceback.format_exc()
+        logging.error('failed to analyse family {}:\n{}'.format(family.family_id,
+            error))
+    
+    return index, results, error, time.time() - start
+
+def run_families(finder, families, options, workers):
+    ''' analyse families in a pool of worker processes
+    
+    Families are analysed in parallel, but the results are exported by the
+    main process in the same order as the families, so the output is the same
+    as running the families one by one.
+    
+    Args:
+        finder: Filter object for the main process, used to export results.
+        families: list of Family objects
+        options: dictionary of arguments for Filter, to set up each worker.
+        workers: number of worker processes to use.
+    
+    Returns:
+        list of (family_id, error) tuples for families that failed.
+    '''
+    
+    failed = []
+    pool = multiprocessing.Pool(workers, _init_worker, (options, ))
+    try:
+        results = pool.imap(_analyse_family, families)
+        for family, (found, error) in zip(families, results):
+            if error is not None:
+                failed.append((family.family_id, error))
+                continue
+            
+            finder.export_family(family, found)
+    finally:
+        pool.close()
+        pool.join()
+    
+    return failed
+
+def read_family(family):
+    ''' read and decompress the VCFs for a family, ready for analysis
+    
+    Args:
+        family: Family object
+    
+    Returns:
+        dictionary of VCF text (after the header), indexed by VCF path
+    '''
+    
+    sources = {}
+    for person in family:
+        if person is None:
+            continue
+        
+        path = person.get_path()
+        with open_vcf(path) as handle:
+            exclude_header(handle)
+            sources[path] = handle.read()
+    
+    return sources
+
+def _format_utilisation(busy, counts, elapsed):
+    ''' summarise how busy each pipeline stage was
+    
+    Args:
+        busy: dictionary of seconds spent working, indexed by stage
+        counts: dictionary of the number of threads or processes per stage
+        elapsed: seconds for the full run
+    
+    Returns:
+        list of lines for the log
+    '''
+    
+    elapsed = max(elapsed, 1e-9)
+    lines = ['pipeline finished in {:.1f} seconds'.format(elapsed)]
+    for stage in ['read', 'analyse', 'write']:
+        lines.append('{} stage: {:.1f} seconds busy over {} worker(s), {:.1%} ' \
+            'utilisation'.format(stage, busy[stage], counts[stage],
+            busy[stage] / (elapsed * counts[stage])))
+    lines.append('waiting on reads or full queues: {:.1f} seconds'.format(busy['wait']))
+    
+    return lines
+
+def run_pipeline(finder, families, options, workers, readers, prefetch=None):
+    ''' analyse families in a staged pipeline of readers, workers and a writer
+    
+    Reader threads read and decompress the VCFs for upcoming families, so
+    slow filesystems don't leave the workers idle. Worker processes analyse
+    the families, and a single writer thread exports the results in the
+    same order as the families. The number of families read but not yet
+    written is bounded, so memory stays flat for large cohorts.
+    
+    Args:
+        finder: Filter object for the main process, used to export results.
+        families: list of Family objects
+        options: dictionary of arguments for Filter, to set up each worker.
+        workers: number of worker processes to use.
+        readers: number of threads to read VCFs with.
+        prefetch: maximum number of families to hold in memory at each stage,
+            defaults to twice the number of workers.
+    
+    Returns:
+        list of (family_id, error) tuples for families that failed.
+    '''
+    
+    if prefetch is None:
+        prefetch = 2 * workers
+    
+    begin = time.time()
+    busy = {'read': 0.0, 'analyse': 0.0, 'write': 0.0, 'wait': 0.0}
+    lock = threading.Lock()
+    def add_time(stage, seconds):
+        with lock:
+            busy[stage] += seconds
+    
+    todo = queue.Queue()
+    for index, family in enumerate(families):
+        todo.put((index, family))
+    
+    loaded = queue.Queue(prefetch)
+    analysed = queue.Queue()
+    slots = threading.BoundedSemaphore(prefetch)
+    failed = []
+    
+    def read():
+        while True:
+            try:
+                index, family = todo.get_nowait()
+            except queue.Empty:
+                return
+            
+            start = time.time()
+            sources, error = None, None
+            try:
+                # panels are read from indexed regions by the workers instead
+                if finder.regions is None:
+                    sources = read_family(family)
+            except Exception:
+                error = traceback.format_exc()
+            add_time('read', time.time() - start)
+            
+            loaded.put((index, family, sources, error))
+    
+    def write():
+        pending = {}
+        current = 0
+        while current < len(families):
+            index, results, error, seconds = analysed.get()
+            add_time('analyse', seconds)
+            pending[index] = (results, error)
+            
+            # export in the same order as the families, holding early results
+            while current in pending:
+                results, error = pending.pop(current)
+                family = families[current]
+                start = time.time()
+                if error is None:
+                    try:
+                        finder.export_family(family, results)
+                    except Exception:
+                        error = traceback.format_exc()
+                
+                if error is not None:
+                    logging.error('failed family {}:\n{}'.format(family.family_id, error))
+                    failed.append((family.family_id, error))
+                
+                add_time('write', time.time() - start)
+                slots.release()
+                current += 1
+    
+    # start the worker processes before any threads, so the workers don't
+    # inherit locks held by the reader or writer threads
+    pool = multiprocessing.Pool(workers, _init_worker, (options, ))
+    
+    threads = [ threading.Thread(target=read) for x in range(readers) ]
+    threads.append(threading.Thread(target=write))
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+    
+    try:
+        for _ in range(len(families)):
+            start = time.time()
+            index, family, sources, error = loaded.get()
+            slots.acquire()
+            add_time('wait', time.time() - start)
+            
+            if error is not None:
+                analysed.put((index, None, error, 0.0))
+                continue
+            
+            def failure(exc, index=index):
+                analysed.put((index, None, repr(exc), 0.0))
+            
+            pool.apply_async(_analyse_family_sources, (index, family, sources),
+                callback=analysed.put, error_callback=failure)
+        
+        for thread in threads:
+            thread.join()
+    finally:
+        pool.close()
+        pool.join()
+    
+    counts = {'read': readers, 'analyse': workers, 'write': 1}
+    for line in _format_utilisation(busy, counts, time.time() - begin):
+        logging.info(line)
+    
+    return failed
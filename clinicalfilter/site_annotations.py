@@ -0,0 +1,281 @@
+'''
+Copyright (c) 2017 Genome Research Ltd.
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of
+this software and associated documentation files (the "Software"), to deal in
+the Software without restriction, including without limitation the rights to
+use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies
+of the Software, and to permit persons to whom the Software is furnished to do
+so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+'''
+
+
+from __future__ import unicode_literals
+
+import gzip
+import io
+import sys
+from collections import namedtuple
+
+from clinicalfilter.variant.info import Info
+from clinicalfilter.variant.snv import SNV
+from clinicalfilter.utils import open_vcf, exclude_header, get_file_checksum
+from clinicalfilter.load_files import open_last_base_sites
+
+IS_PYTHON3 = sys.version_info.major == 3
+
+FORMAT_VERSION = '1'
+
+# bit flags for the functional consequence classes of a site
+LOF = 1
+MISSENSE = 2
+SYNONYMOUS = 4
+
+# PolyPhen predictions, ordered from least to most damaging
+POLYPHEN_CLASSES = ['unknown', 'benign', 'possibly_damaging',
+    'probably_damaging']
+
+COLUMNS = ['chrom', 'pos', 'ref', 'alt', 'consequence', 'genes', 'max_af',
+    'polyphen']
+
+class SiteAnnotation(namedtuple('SiteAnnotation', ['consequence', 'genes',
+        'max_af', 'polyphen'])):
+    ''' sample-independent annotation for a single site.
+    
+    The consequence is a bitmask of the LOF, MISSENSE and SYNONYMOUS classes
+    across all alleles and genes at the site, genes is a tuple of the preferred
+    gene IDs across all alleles, max_af is the maximum population allele
+    frequency (or None) and polyphen is the most damaging PolyPhen class (or
+    None if the site lacks PolyPhen predictions).
+    '''
+    
+    def can_pass(self, known_genes=None):
+        ''' check whether a variant at the site could pass the site filters.
+        
+        This mirrors the consequence, MAF and known gene checks in
+        SNV.check_filters(). Samples can only drop alleles from consideration
+        (see Variant.get_low_depth_alleles()), so if the annotation across all
+        alleles fails, the variant must fail for every sample.
+        
+        Args:
+            known_genes: dictionary of known genes, or None
+        
+        Returns:
+            True/False for whether a variant at the site could pass.
+        '''
+        
+        if not self.consequence & (LOF | MISSENSE):
+            return False
+        
+        if self.max_af is not None and self.max_af > SNV.max_maf:
+            return False
+        
+        if known_genes is not None and len(set(self.genes) & set(known_genes)) == 0:
+            return False
+        
+        return True
+
+def get_consequence_mask(info):
+    ''' get the consequence classes for a site as a bitmask
+    
+    Args:
+        info: Info object, with genes and consequences already set
+    
+    Returns:
+        integer bitmask of LOF, MISSENSE and SYNONYMOUS flags
+    '''
+    
+    mask = 0
+    if info.is_lof():
+        mask |= LOF
+    if info.is_missense(is_cnv=False):
+        mask |= MISSENSE
+    if info.consequence is not None:
+        cq = set(info.get_per_gene_consequence(None))
+        if len(cq & info.synonymous_consequences) > 0:
+            mask |= SYNONYMOUS
+    
+    return mask
+
+def get_polyphen_class(info):
+    ''' get the most damaging PolyPhen prediction at a site
+    
+    Args:
+        info: Info object
+    
+    Returns:
+        PolyPhen class e.g. 'benign', or None if there isn't a prediction
+    '''
+    
+    if 'PolyPhen' not in info:
+        return None
+    
+    values = info['PolyPhen'].replace(',', '|').split('|')
+    values = [ x.split('(')[0] for x in values ]
+    values = [ x for x in values if x in POLYPHEN_CLASSES ]
+    
+    if values == []:
+        return None
+    
+    return max(values, key=POLYPHEN_CLASSES.index)
+
+def annotate_site(chrom, pos, alts, info_values):
+    ''' derive the sample-independent annotation for a site
+    
+    Info.populations and Info.last_base need to be set before calling this.
+    
+    Args:
+        chrom: chromosome string
+        pos: nucleotide position as int
+        alts: tuple of alternate alleles
+        info_values: INFO text from a VCF line
+    
+    Returns:
+        SiteAnnotation for the site
+    '''
+    
+    info = Info(info_values)
+    info.set_genes_and_consequence(chrom, pos, alts, [])
+    
+    genes = set([ x for sublist in info.get_genes() for x in sublist ])
+    genes = tuple(sorted( x for x in genes if x is not None ))
+    
+    return SiteAnnotation(get_consequence_mask(info), genes,
+        info.find_max_allele_frequency(), get_polyphen_class(info))
+
+def _format_site(key, site):
+    ''' convert a site key and annotation to a line for the sidecar file
+    '''
+    
+    chrom, pos, ref, alt = key
+    genes = ','.join(site.genes) if len(site.genes) > 0 else '.'
+    max_af = repr(site.max_af) if site.max_af is not None else 'NA'
+    polyphen = site.polyphen if site.polyphen is not None else '.'
+    
+    line = [chrom, str(pos), ref, alt, str(site.consequence), genes, max_af,
+        polyphen]
+    
+    return '\t'.join(line) + '\n'
+
+def _parse_site(line):
+    ''' convert a line from the sidecar file to a site key and annotation
+    '''
+    
+    chrom, pos, ref, alt, cq, genes, max_af, polyphen = line.rstrip('\n').split('\t')
+    
+    genes = tuple(genes.split(',')) if genes != '.' else ()
+    max_af = float(max_af) if max_af != 'NA' else None
+    polyphen = polyphen if polyphen != '.' else None
+    
+    return (chrom, int(pos), ref, alt), SiteAnnotation(int(cq), genes, max_af,
+        polyphen)
+
+def build_site_annotations(paths, output_path, populations=None, lof_sites=None):
+    ''' build a persisted index of site annotations from a set of VCFs
+    
+    The INFO annotation for a site (consequence, gene symbols, population
+    allele frequencies, PolyPhen) is identical in every sample's VCF, so we
+    only need to parse it once per cohort. CNVs are excluded, since they are
+    handled separately.
+    
+    Args:
+        paths: list of paths to VCFs
+        output_path: path to write the gzipped index to
+        populations: list of population tags for allele frequencies in the INFO
+        lof_sites: path to the last base sites file, or None
+    
+    Returns:
+        number of sites in the index
+    '''
+    
+    if populations is None:
+        populations = []
+    
+    Info.set_populations(populations)
+    Info.set_last_base_sites(open_last_base_sites(lof_sites))
+    
+    sites = {}
+    for path in paths:
+        with open_vcf(path) as vcf:
+            exclude_header(vcf)
+            for line in vcf:
+                chrom, pos, _, ref, alt, _, _, info = line.split('\t', 8)[:8]
+                key = (chrom, int(pos), ref, alt)
+                if key in sites or alt in ['<DUP>', '<DEL>']:
+                    continue
+                
+                sites[key] = annotate_site(chrom, key[1], tuple(alt.split(',')), info)
+    
+    with gzip.open(output_path, 'wt' if IS_PYTHON3 else 'w') as handle:
+        handle.write('##clinicalfilter_site_annotations={}\n'.format(FORMAT_VERSION))
+        handle.write('##populations={}\n'.format(','.join(populations)))
+        handle.write('##last_base_checksum={}\n'.format(get_file_checksum(lof_sites)))
+        handle.write('#' + '\t'.join(COLUMNS) + '\n')
+        for key in sorted(sites):
+            handle.write(_format_site(key, sites[key]))
+    
+    return len(sites)
+
+def open_site_annotations(path, populations=None, lof_sites=None):
+    ''' load a persisted index of site annotations
+    
+    The index was built under a set of populations and last base sites, which
+    determine the allele frequencies and consequences. We check these match the
+    current analysis, so we don't filter on stale annotations.
+    
+    Args:
+        path: path to site annotation index, or None
+        populations: list of population tags used in the current analysis
+        lof_sites: path to the last base sites file, or None
+    
+    Returns:
+        dictionary of SiteAnnotations, indexed by (chrom, pos, ref, alt)
+        tuples, or None if the path is None.
+    
+    Raises:
+        ValueError if the index does not match the current analysis settings
+    '''
+    
+    if path is None:
+        return None
+    
+    if populations is None:
+        populations = []
+    
+    sites = {}
+    metadata = {}
+    with io.TextIOWrapper(gzip.open(path, 'r')) as handle:
+        for line in handle:
+            if line.startswith('##'):
+                key, value = line[2:].rstrip('\n').split('=', 1)
+                metadata[key] = value
+                continue
+            elif line.startswith('#'):
+                continue
+            
+            key, site = _parse_site(line)
+            sites[key] = site
+    
+    if metadata.get('clinicalfilter_site_annotations') != FORMAT_VERSION:
+        raise ValueError('unknown site annotation format: {}'.format(path))
+    
+    if metadata['populations'].split(',') != list(populations) and \
+            not (metadata['populations'] == '' and len(populations) == 0):
+        raise ValueError('site annotations in {} were built with different '
+            'populations: {}'.format(path, metadata['populations']))
+    
+    if metadata['last_base_checksum'] != get_file_checksum(lof_sites):
+        raise ValueError('site annotations in {} were built with a different '
+            'last base sites file'.format(path))
+    
+    return sites
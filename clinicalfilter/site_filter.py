@@ -0,0 +1,251 @@
+'''
+Copyright (c) 2017 Genome Research Ltd.
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of
+this software and associated documentation files (the "Software"), to deal in
+the Software without restriction, including without limitation the rights to
+use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies
+of the Software, and to permit persons to whom the Software is furnished to do
+so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+'''
+
+
+from __future__ import division
+
+import hashlib
+import math
+
+from clinicalfilter.load_files import open_known_genes
+from clinicalfilter.site_annotations import open_site_annotations
+from clinicalfilter.variant.snv import SNV
+from clinicalfilter.utils import get_file_checksum
+
+FORMAT_VERSION = '1'
+
+class SiteFilter(object):
+    ''' Bloom filter of sites that could pass the site-level filters.
+    
+    Most lines in a VCF fail on consequence, MAF or known gene membership,
+    which don't depend on the sample. We test (chrom, pos, alt) against the
+    filter before parsing the line. The filter can give false positives (which
+    get parsed and fail as usual) but never false negatives, for sites that
+    were included when the filter was built.
+    '''
+    
+    def __init__(self, bits, hashes, data=None, metadata=None):
+        ''' initialise the filter
+        
+        Args:
+            bits: number of bits in the filter
+            hashes: number of hash functions per site
+            data: bytearray for the filter bits, or None for an empty filter
+            metadata: dictionary of the settings the filter was built under
+        '''
+        
+        self.bits = bits
+        self.hashes = hashes
+        self.data = data
+        if self.data is None:
+            self.data = bytearray((bits + 7) // 8)
+        
+        self.metadata = metadata
+        if self.metadata is None:
+            self.metadata = {}
+    
+    @classmethod
+    def for_capacity(cls, capacity, error_rate=0.001):
+        ''' create an empty filter sized for a number of sites
+        
+        Args:
+            capacity: number of sites to add to the filter
+            error_rate: acceptable false positive rate
+        '''
+        
+        capacity = max(capacity, 1)
+        bits = int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        hashes = max(1, int(round(bits / capacity * math.log(2))))
+        
+        return cls(bits, hashes)
+    
+    def __repr__(self):
+        return 'SiteFilter(bits={}, hashes={})'.format(self.bits, self.hashes)
+    
+    def _positions(self, chrom, pos, alt):
+        ''' get the bit positions for a site, using double hashing
+        '''
+        
+        key = '{}:{}:{}'.format(chrom, pos, alt).encode('utf8')
+        digest = int(hashlib.md5(key).hexdigest(), 16)
+        first = digest & 0xFFFFFFFFFFFFFFFF
+        second = digest >> 64
+        
+        return [ (first + i * second) % self.bits for i in range(self.hashes) ]
+    
+    def add(self, chrom, pos, alt):
+        ''' add a site to the filter
+        
+        Args:
+            chrom: chromosome string
+            pos: nucleotide position (int or string)
+            alt: alternate alleles string, as in the VCF ALT column
+        '''
+        
+        for x in self._positions(chrom, pos, alt):
+            self.data[x >> 3] |= 1 << (x & 7)
+    
+    def __contains__(self, site):
+        ''' check if a (chrom, pos, alt) site could be in the filter
+        '''
+        
+        data = self.data
+        return all( data[x >> 3] & (1 << (x & 7))
+            for x in self._positions(*site) )
+    
+    def might_pass(self, line, mnvs=None):
+        ''' check if a VCF line could pass the site filters, before parsing
+        
+        CNVs are checked separately, and MNV candidates can alter the
+        consequence, so both always pass here.
+        
+        Args:
+            line: unsplit VCF line
+            mnvs: dictionary of MNV codes, indexed by (chrom, pos), or None
+        
+        Returns:
+            True/False for whether the line should be parsed
+        '''
+        
+        chrom, pos, _, _, alt, _ = line.split('\t', 5)
+        if alt in ['<DUP>', '<DEL>']:
+            return True
+        
+        if mnvs is not None and (chrom, int(pos)) in mnvs:
+            return True
+        
+        return (chrom, pos, alt) in self
+    
+    def write(self, path):
+        ''' write the filter to a file
+        '''
+        
+        with open(path, 'wb') as handle:
+            handle.write('##clinicalfilter_site_filter={}\n'.format(FORMAT_VERSION).encode('utf8'))
+            handle.write('##bits={}\n'.format(self.bits).encode('utf8'))
+            handle.write('##hashes={}\n'.format(self.hashes).encode('utf8'))
+            for key in sorted(self.metadata):
+                handle.write('##{}={}\n'.format(key, self.metadata[key]).encode('utf8'))
+            handle.write(b'#\n')
+            handle.write(bytes(self.data))
+    
+    @classmethod
+    def read(cls, path):
+        ''' read a filter from a file
+        '''
+        
+        metadata = {}
+        with open(path, 'rb') as handle:
+            line = handle.readline()
+            while line.startswith(b'##'):
+                key, value = line[2:].decode('utf8').rstrip('\n').split('=', 1)
+                metadata[key] = value
+                line = handle.readline()
+            data = bytearray(handle.read())
+        
+        if metadata.pop('clinicalfilter_site_filter', None) != FORMAT_VERSION:
+            raise ValueError('unknown site filter format: {}'.format(path))
+        
+        bits = int(metadata.pop('bits'))
+        hashes = int(metadata.pop('hashes'))
+        
+        return cls(bits, hashes, data, metadata)
+
+def get_filter_settings(known_genes_path, populations, lof_sites):
+    ''' get the settings which determine which sites pass the site filters
+    
+    Args:
+        known_genes_path: path to known genes file, or None
+        populations: list of population tags
+        lof_sites: path to last base sites file, or None
+    
+    Returns:
+        dictionary of settings, stored alongside the filter
+    '''
+    
+    if populations is None:
+        populations = []
+    
+    return {'known_genes_checksum': get_file_checksum(known_genes_path),
+        'populations': ','.join(populations),
+        'last_base_checksum': get_file_checksum(lof_sites),
+        'max_maf': repr(SNV.max_maf)}
+
+def build_site_filter(sites_path, output_path, known_genes_path=None,
+        populations=None, lof_sites=None, error_rate=0.001):
+    ''' build a filter of cohort sites that could pass the site filters
+    
+    Args:
+        sites_path: path to site annotations index for the cohort
+        output_path: path to write the filter to
+        known_genes_path: path to known genes file, or None
+        populations: list of population tags
+        lof_sites: path to last base sites file, or None
+        error_rate: acceptable false positive rate for the filter
+    
+    Returns:
+        number of sites included in the filter
+    '''
+    
+    sites = open_site_annotations(sites_path, populations, lof_sites)
+    known_genes = open_known_genes(known_genes_path)
+    
+    passing = [ x for x in sites if sites[x].can_pass(known_genes) ]
+    
+    site_filter = SiteFilter.for_capacity(len(passing), error_rate)
+    site_filter.metadata = get_filter_settings(known_genes_path, populations,
+        lof_sites)
+    
+    for (chrom, pos, ref, alt) in passing:
+        site_filter.add(chrom, pos, alt)
+    
+    site_filter.write(output_path)
+    
+    return len(passing)
+
+def open_site_filter(path, known_genes_path=None, populations=None, lof_sites=None):
+    ''' load a site filter, checking it matches the current analysis settings
+    
+    Args:
+        path: path to site filter, or None
+        known_genes_path: path to known genes file, or None
+        populations: list of population tags
+        lof_sites: path to last base sites file, or None
+    
+    Returns:
+        SiteFilter object, or None if the path is None
+    
+    Raises:
+        ValueError if the filter was built under different settings
+    '''
+    
+    if path is None:
+        return None
+    
+    site_filter = SiteFilter.read(path)
+    expected = get_filter_settings(known_genes_path, populations, lof_sites)
+    
+    for key in sorted(expected):
+        if site_filter.metadata.get(key) != expected[key]:
+            raise ValueError('site filter {} was built with a different {} '
+                'setting'.format(path, key))
+    
+    return site_filter
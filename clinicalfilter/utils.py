@@ -26,6 +26,8 @@ import sys
 import gzip
 import hashlib
 
+import tabix
+
 from clinicalfilter.variant.snv import SNV
 from clinicalfilter.variant.cnv import CNV
 
@@ -118,6 +120,56 @@ def exclude_header(vcf):
     
     vcf.seek(current_pos)
 
+def _alternate_chrom(chrom):
+    """ swap between chromosome names with and without a 'chr' prefix
+    """
+    
+    if chrom.lower().startswith('chr'):
+        return chrom[3:]
+    
+    return 'chr' + chrom
+
+def fetch_regions(path, regions):
+    """ get the VCF lines within a set of regions, from a tabix-indexed VCF
+    
+    Lines are returned in the same form as when iterating through the VCF
+    file, so we can read regions in place of the full file. Records which
+    span more than one region (such as CNVs) are only returned once.
+    
+    Args:
+        path: path to bgzipped and tabix-indexed VCF.
+        regions: list of (chrom, start, end) tuples, using 1-based, inclusive
+            coordinates, sorted by chromosome and position.
+    
+    Returns:
+        iterator of VCF lines (as strings).
+    """
+    
+    if not os.path.exists(path + '.tbi'):
+        raise ValueError("region queries need a tabix index: {}.tbi".format(path))
+    
+    vcf = tabix.open(path)
+    
+    seen = set()
+    for chrom, start, end in regions:
+        try:
+            lines = vcf.query(chrom, start - 1, end)
+        except tabix.TabixError:
+            # the VCF might name chromosomes differently to the regions, or
+            # lack the chromosome altogether
+            try:
+                lines = vcf.query(_alternate_chrom(chrom), start - 1, end)
+            except tabix.TabixError:
+                continue
+        
+        for line in lines:
+            key = tuple(line[:5])
+            if key in seen:
+                continue
+            
+            seen.add(key)
+            yield '\t'.join(line) + '\n'
+
 def construct_variant(line, gender, mnvs=None, sum_x_lr2=None, parents=None):
     """ constructs a Variant object for a VCF line, specific to the variant type
     
@@ -154,23 +206,19 @@ def construct_variant(line, gender, mnvs=None, sum_x_lr2=None, parents=None):
     
     return var
 
-def get_vcf_provenance(person):
-    """ get provenance information for a VCF
+def get_file_checksum(path):
+    """ get the SHA1 hash of a file (in a memory efficient manner)
     
     Args:
-        person: Person object for an individual, or None if the person doesn't exist
+        path: path to file, or None
     
     Returns:
-        returns a tuple of sha1 VCF file hash, name of VCF file (without
-        directory), and date the VCF file was generated
+        hex digest string for the file contents, or 'NA' if the path is None
     """
     
-    if person is None:
-        return ('NA', 'NA', 'NA')
-    
-    path = person.get_path()
+    if path is None:
+        return 'NA'
     
-    # get the SHA1 hash of the VCF file (in a memory efficient manner)
     BLOCKSIZE = 65536
     checksum = hashlib.sha1()
     with open(path, "rb") as handle:
@@ -179,7 +227,24 @@ def get_vcf_provenance(person):
             checksum.update(buf)
             buf = handle.read(BLOCKSIZE)
     
-    checksum = checksum.hexdigest()
+    return checksum.hexdigest()
+
+def get_vcf_provenance(person):
+    """ get provenance information for a VCF
+    
+    Args:
+        person: Person object for an individual, or None if the person doesn't exist
+    
+    Returns:
+        returns a tuple of sha1 VCF file hash, name of VCF file (without
+        directory), and date the VCF file was generated
+    """
+    
+    if person is None:
+        return ('NA', 'NA', 'NA')
+    
+    path = person.get_path()
+    checksum = get_file_checksum(path)
     basename = os.path.basename(path)
     
     date = None
@@ -0,0 +1,117 @@
+'''
+Copyright (c) 2017 Genome Research Ltd.
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of
+this software and associated documentation files (the "Software"), to deal in
+the Software without restriction, including without limitation the rights to
+use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies
+of the Software, and to permit persons to whom the Software is furnished to do
+so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+'''
+
+
+from collections import OrderedDict
+
+class AnnotationCache(object):
+    ''' bounded least-recently-used cache of parsed INFO annotations.
+    
+    Sites recur across the families analysed in a single process, and the INFO
+    annotation is identical for a site in every sample. Entries are indexed by
+    the site and a hash of the INFO text, and hold the parsed INFO dictionary,
+    plus the gene symbols, consequences and gene IDs derived from it (which
+    depend on which alleles were masked in the sample), and maximum allele
+    frequencies.
+    '''
+    
+    def __init__(self, max_size=100000):
+        ''' initialise the cache
+        
+        Args:
+            max_size: maximum number of sites to hold in the cache
+        '''
+        
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def __len__(self):
+        return len(self.entries)
+    
+    def __repr__(self):
+        return 'AnnotationCache(max_size={})'.format(self.max_size)
+    
+    def get(self, key):
+        ''' get the entry for a site, or None if the site is not cached
+        
+        Args:
+            key: (chrom, pos, ref, alts, info_hash) tuple for a site
+        '''
+        
+        try:
+            entry = self.entries.pop(key)
+        except KeyError:
+            self.misses += 1
+            return None
+        
+        # reinsert the entry, to move it to the most recently used end
+        self.entries[key] = entry
+        self.hits += 1
+        
+        return entry
+    
+    def add(self, key, info):
+        ''' add an entry for a site, dropping the least recently used entries
+        
+        Args:
+            key: (chrom, pos, ref, alts, info_hash) tuple for a site
+            info: parsed INFO dictionary for the site
+        
+        Returns:
+            dictionary for the cache entry
+        '''
+        
+        entry = {'info': info, 'derived': {}, 'max_af': {}}
+        self.entries[key] = entry
+        
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+        
+        return entry
+    
+    def clear(self):
+        ''' drop all the cached entries, e.g. when the last base sites change
+        '''
+        
+        self.entries.clear()
+    
+    def hit_rate(self):
+        ''' get the proportion of lookups which were found in the cache
+        '''
+        
+        total = self.hits + self.misses
+        if total == 0:
+            return 0.0
+        
+        return self.hits / float(total)
+    
+    def stats(self):
+        ''' get a summary of the cache usage, suitable for logging
+        '''
+        
+        return 'annotation cache: {} entries, {} hits, {} misses, {} ' \
+            'evictions, hit rate {:.3f}'.format(len(self), self.hits,
+            self.misses, self.evictions, self.hit_rate())
@@ -33,6 +33,9 @@ class CNV(Variant):
     debug_chrom = None
     debug_pos = None
     
+    # CNV annotations are modified per individual, so can't be shared
+    cache_annotations = False
+    
     @classmethod
     def set_debug(cls, chrom, pos):
         cls.debug_chrom = chrom
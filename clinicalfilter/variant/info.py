@@ -41,10 +41,21 @@ class Info(object):
     # create static variables (set before creating any class instances)
     last_base = set([])
     populations = []
+    cache = None
     
     @classmethod
     def set_last_base_sites(cls_obj, sites):
-        cls_obj.last_base = set(sites)
+        sites = set(sites)
+        # the cached consequences depend on the last base sites
+        if cls_obj.cache is not None and sites != cls_obj.last_base:
+            cls_obj.cache.clear()
+        cls_obj.last_base = sites
+    
+    @classmethod
+    def set_cache(cls_obj, cache):
+        ''' define an AnnotationCache to share parsed INFO between variants
+        '''
+        cls_obj.cache = cache
     
     @classmethod
     def set_populations(cls_obj, populations):
@@ -54,18 +65,42 @@ class Info(object):
             assert type(populations) == list
             cls_obj.populations = populations
     
-    def __init__(self, info_values, mnv_code=None):
+    def __init__(self, info_values, mnv_code=None, site=None):
         """Parses the INFO column from VCF files.
         
         Args:
             info_values: INFO text from a line in a VCF file
+            site: (chrom, pos, ref, alts) tuple for the variant, or None. If
+                given, the parsed INFO is shared via the annotation cache.
         """
         
         self.mnv_code = mnv_code
         self.info = {}
+        self.cached = None
+        self.genes = None
         if info_values is None:
             return
         
+        if site is not None and self.cache is not None:
+            key = site + (hash(info_values), )
+            self.cached = self.cache.get(key)
+            if self.cached is not None:
+                # copy the dictionary, since INFO entries can be added later
+                self.info = dict(self.cached['info'])
+                return
+            
+            self.parse(info_values)
+            self.cached = self.cache.add(key, dict(self.info))
+        else:
+            self.parse(info_values)
+    
+    def parse(self, info_values):
+        """ parse INFO text into the info dictionary
+        
+        Args:
+            info_values: INFO text from a line in a VCF file
+        """
+        
         for item in info_values.split(";"):
             if "=" in item:
                 try:
@@ -81,8 +116,21 @@ class Info(object):
     def set_genes_and_consequence(self, chrom, pos, alts, masked):
         ''' find the gene symbols and consequences for good alleles
         '''
+        
+        # cached entries hold the symbols and consequences for each set of
+        # masked alleles seen at the site
+        if self.cached is not None and tuple(masked) in self.cached['derived']:
+            self.symbols, self.consequence, self.genes = \
+                self.cached['derived'][tuple(masked)]
+            return
+        
         self.symbols = self.parse_gene_symbols(alts, masked)
         self.consequence = self.get_consequences(chrom, pos, alts, masked)
+        
+        if self.cached is not None:
+            self.genes = [ x.prioritise() for x in self.symbols ]
+            self.cached['derived'][tuple(masked)] = (self.symbols,
+                self.consequence, self.genes)
     
     def __str__(self):
         ''' reprocess the info dictionary back into a string, correctly sorted
@@ -146,6 +194,9 @@ class Info(object):
         if self.symbols is None:
             return []
         
+        if self.genes is not None:
+            return self.genes
+        
         return [ x.prioritise() for x in self.symbols ]
     
     def get_consequences(self, chrom, pos, alts, masked):
@@ -360,6 +411,10 @@ class Info(object):
             variant record
         """
         
+        populations = tuple(self.populations)
+        if self.cached is not None and populations in self.cached['max_af']:
+            return self.cached['max_af'][populations]
+        
         max_freq = None
         # check all the populations with MAF values recorded for the variant
         # (typically the 1000 Genomes populations (AFR_AF, EUR_AF etc), any
@@ -372,4 +427,7 @@ class Info(object):
             if max_freq is None or frequency > max_freq:
                 max_freq = frequency
         
+        if self.cached is not None:
+            self.cached['max_af'][populations] = max_freq
+        
         return max_freq
@@ -32,6 +32,9 @@ class SNV(Variant):
     debug_chrom = None
     debug_pos = None
     
+    # variants more common than this in any population fail the filters
+    max_maf = 0.005
+    
     @classmethod
     def set_debug(cls_obj, chrom, pos):
         cls_obj.debug_chrom = chrom
@@ -256,7 +259,7 @@ class SNV(Variant):
         
         # exclude variants with high minor allele frequencies in any population
         max_maf = self.info.find_max_allele_frequency()
-        if max_maf is not None and max_maf > 0.005:
+        if max_maf is not None and max_maf > self.max_maf:
             return (False, "MAF")
         
         # exclude variants outside genes known to be involved in genetic
@@ -34,6 +34,9 @@ class Variant(object):
     y_pseudoautosomal_regions = [(10001, 2649520), (59034050, 59363566)]
     known_genes = None
     
+    # whether the parsed INFO can be shared with other variants at the site
+    cache_annotations = True
+    
     @classmethod
     def set_known_genes(cls_obj, known_genes):
         cls_obj.known_genes = known_genes
@@ -74,7 +77,11 @@ class Variant(object):
         if format is not None and sample is not None:
             self.add_format(format, sample)
         
-        self.info = Info(info, self.mnv_code)
+        site = None
+        if self.cache_annotations:
+            site = (self.chrom, self.position, self.ref_allele, self.alt_alleles)
+        
+        self.info = Info(info, self.mnv_code, site)
         masked = self.get_low_depth_alleles(self.ref_allele, self.alt_alleles)
         self.info.set_genes_and_consequence(self.get_chrom(),
             self.get_position(), self.alt_alleles, masked)
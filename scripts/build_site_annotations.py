@@ -0,0 +1,74 @@
+'''
+Copyright (c) 2017 Genome Research Ltd.
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of
+this software and associated documentation files (the "Software"), to deal in
+the Software without restriction, including without limitation the rights to
+use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies
+of the Software, and to permit persons to whom the Software is furnished to do
+so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+'''
+
+
+from __future__ import print_function
+
+import argparse
+
+from clinicalfilter.ped import load_families
+from clinicalfilter.site_annotations import build_site_annotations
+
+def get_options():
+    """ gets the options from the command line
+    """
+    
+    parser = argparse.ArgumentParser(description="Build an index of the "
+        "sample-independent annotation for every site in a cohort's VCFs.")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--ped",
+        help="Path to ped file, we index the VCFs of the affected probands.")
+    group.add_argument("--vcfs", nargs="+", help="Paths to VCF files.")
+    parser.add_argument("--output", required=True,
+        help="Path to write the site annotations to.")
+    parser.add_argument("--lof-sites",
+        help="path to file of sites at the last base of exons that are "
+            "potentially LoF sites.")
+    parser.add_argument("--maf-populations",
+        default="AFR_AF,AMR_AF,ASN_AF,DDD_AF,EAS_AF,ESP_AF,EUR_AF,MAX_AF,"
+            "SAS_AF,UK10K_cohort_AF",
+        help="Comma separated list of population tags, this must match the "
+            "populations used for the analysis.")
+    
+    return parser.parse_args()
+
+def get_proband_paths(ped_path):
+    """ get the VCF paths for the affected probands in a ped file
+    """
+    
+    families = load_families(ped_path)
+    
+    return sorted(set( x.get_path() for family in families
+        for x in family.children if x.is_affected() ))
+
+def main():
+    args = get_options()
+    
+    paths = args.vcfs
+    if args.ped is not None:
+        paths = get_proband_paths(args.ped)
+    
+    populations = args.maf_populations.split(',')
+    count = build_site_annotations(paths, args.output, populations, args.lof_sites)
+    print('indexed {} sites from {} VCFs'.format(count, len(paths)))
+
+if __name__ == "__main__":
+    main()
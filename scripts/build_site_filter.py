@@ -0,0 +1,63 @@
+'''
+Copyright (c) 2017 Genome Research Ltd.
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of
+this software and associated documentation files (the "Software"), to deal in
+the Software without restriction, including without limitation the rights to
+use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies
+of the Software, and to permit persons to whom the Software is furnished to do
+so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+'''
+
+
+from __future__ import print_function
+
+import argparse
+
+from clinicalfilter.site_filter import build_site_filter
+
+def get_options():
+    """ gets the options from the command line
+    """
+    
+    parser = argparse.ArgumentParser(description="Build a filter of the "
+        "cohort sites which could pass the site-level filters.")
+    parser.add_argument("--site-annotations", required=True,
+        help="Path to site annotations, from build_site_annotations.py.")
+    parser.add_argument("--output", required=True,
+        help="Path to write the site filter to.")
+    parser.add_argument("--known-genes",
+        help="Path to table of known disease causative genes.")
+    parser.add_argument("--lof-sites",
+        help="path to file of sites at the last base of exons that are "
+            "potentially LoF sites.")
+    parser.add_argument("--maf-populations",
+        default="AFR_AF,AMR_AF,ASN_AF,DDD_AF,EAS_AF,ESP_AF,EUR_AF,MAX_AF,"
+            "SAS_AF,UK10K_cohort_AF",
+        help="Comma separated list of population tags, this must match the "
+            "populations used for the analysis.")
+    parser.add_argument("--error-rate", type=float, default=0.001,
+        help="False positive rate for the filter (default=0.001).")
+    
+    return parser.parse_args()
+
+def main():
+    args = get_options()
+    
+    populations = args.maf_populations.split(',')
+    count = build_site_filter(args.site_annotations, args.output,
+        args.known_genes, populations, args.lof_sites, args.error_rate)
+    print('{} sites could pass the site filters'.format(count))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+'''
+Copyright (c) 2017 Genome Research Ltd.
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of
+this software and associated documentation files (the "Software"), to deal in
+the Software without restriction, including without limitation the rights to
+use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies
+of the Software, and to permit persons to whom the Software is furnished to do
+so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+'''
+
+
+import unittest
+
+from clinicalfilter.gene_intervals import GeneIntervals
+
+from tests.utils import make_vcf_line
+
+class TestGeneIntervalsPy(unittest.TestCase):
+    ''' test the GeneIntervals cursor over known gene spans
+    '''
+    
+    def setUp(self):
+        known = {
+            '1': {'chrom': '1', 'start': 100, 'end': 200},
+            '2': {'chrom': '1', 'start': 150, 'end': 250},
+            '3': {'chrom': '1', 'start': 1000, 'end': 1100},
+            '4': {'chrom': 'X', 'start': 500, 'end': 600},
+            }
+        self.intervals = GeneIntervals(known)
+    
+    def test_merged(self):
+        ''' check overlapping gene spans get merged
+        '''
+        
+        self.assertEqual(len(self.intervals), 3)
+        self.assertEqual(self.intervals.starts['1'], [100, 1000])
+        self.assertEqual(self.intervals.ends['1'], [250, 1100])
+    
+    def test_contains(self):
+        ''' check sites are found within the gene spans, in sorted order
+        '''
+        
+        positions = [('1', 50), ('1', 100), ('1', 250), ('1', 251),
+            ('1', 1050), ('1', 2000), ('X', 550), ('Y', 550)]
+        results = [ self.intervals.contains(*x) for x in positions ]
+        self.assertEqual(results, [False, True, True, False, True, False,
+            True, False])
+    
+    def test_contains_unsorted(self):
+        ''' check sites are still found if positions move backwards
+        '''
+        
+        self.assertTrue(self.intervals.contains('1', 1050))
+        self.assertTrue(self.intervals.contains('1', 120))
+        self.assertFalse(self.intervals.contains('1', 50))
+        self.assertTrue(self.intervals.contains('X', 550))
+        self.assertTrue(self.intervals.contains('1', 200))
+    
+    def test_contains_chr_prefix(self):
+        ''' check chromosomes match with and without a 'chr' prefix
+        '''
+        
+        self.assertTrue(self.intervals.contains('chr1', 150))
+        self.assertTrue(self.intervals.contains('chrX', 550))
+        
+        intervals = GeneIntervals({'1': {'chrom': 'chr1', 'start': 10, 'end': 20}})
+        self.assertTrue(intervals.contains('1', 15))
+    
+    def test_flank(self):
+        ''' check gene spans can be padded
+        '''
+        
+        intervals = GeneIntervals({'1': {'chrom': '1', 'start': 100, 'end': 200}},
+            flank=10)
+        self.assertTrue(intervals.contains('1', 90))
+        self.assertTrue(intervals.contains('1', 210))
+        self.assertFalse(intervals.contains('1', 211))
+    
+    def test_might_pass(self):
+        ''' check VCF lines are checked by position, except for CNVs
+        '''
+        
+        line = make_vcf_line(pos=150)
+        self.assertTrue(self.intervals.might_pass(line))
+        
+        line = make_vcf_line(pos=5000)
+        self.assertFalse(self.intervals.might_pass(line))
+        
+        line = make_vcf_line(pos=5000, alts='<DEL>')
+        self.assertTrue(self.intervals.might_pass(line))
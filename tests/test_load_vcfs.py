@@ -38,6 +38,9 @@ from clinicalfilter.load_vcfs import load_variants, include_variant, \
     open_individual, load_trio, combine_trio_variants, get_parental_var, \
     filter_de_novos
 from clinicalfilter.ped import Family, Person
+from clinicalfilter.site_annotations import SiteAnnotation, MISSENSE, SYNONYMOUS
+from clinicalfilter.site_filter import SiteFilter
+from clinicalfilter.gene_intervals import GeneIntervals
 
 IS_PYTHON3 = sys.version_info.major == 3
 
@@ -144,6 +147,26 @@ class TestLoadVCFsPy(unittest.TestCase):
         gender = "M"
         self.assertFalse(include_variant(line, child_keys, gender, mnvs, sum_x_l2r, parents))
     
+    def test_include_variant_with_site_annotations(self):
+        """ check that include_variant() uses precomputed site annotations
+        """
+        
+        line = ["1", "100", ".", "T", "A", "1000", "PASS", "CQ=missense_variant;HGNC=ATRX", "GT", "0/1"]
+        
+        # a site annotated as failing is excluded without checking the INFO
+        sites = {("1", 100, "T", "A"): SiteAnnotation(SYNONYMOUS, ("ATRX", ), None, None)}
+        self.assertFalse(include_variant(line, None, "M", {}, {}, True, sites))
+        
+        # but MNV candidates can have modified consequences, so get checked
+        mnvs = {("1", 100): "modified_protein_altering_mnv"}
+        self.assertTrue(include_variant(line, None, "M", mnvs, {}, True, sites))
+        
+        # sites that pass the site annotation, or are missing from the site
+        # annotations, are checked as usual
+        sites = {("1", 100, "T", "A"): SiteAnnotation(MISSENSE, ("ATRX", ), None, None)}
+        self.assertTrue(include_variant(line, None, "M", {}, {}, True, sites))
+        self.assertTrue(include_variant(line, None, "M", {}, {}, True, {}))
+    
     def test_open_individual(self):
         ''' test that open_individual() works correctly
         '''
@@ -175,6 +198,49 @@ class TestLoadVCFsPy(unittest.TestCase):
         self.assertEqual(open_individual(person,
             child_variants=child_keys), [var1, var2])
     
+    def test_open_individual_with_site_filter(self):
+        ''' test that open_individual() skips lines missing from a site filter
+        '''
+        
+        vcf = make_vcf_header()
+        vcf.append(make_vcf_line(pos=1, extra='HGNC=ATRX;MAX_AF=0.0001'))
+        vcf.append(make_vcf_line(pos=2, extra='HGNC=ATRX;MAX_AF=0.0001'))
+        
+        path = os.path.join(self.temp_dir, "temp.vcf")
+        write_temp_vcf(path, vcf)
+        
+        person = Person('fam_id', 'sample', 'dad', 'mom', 'F', '2', path)
+        
+        site_filter = SiteFilter.for_capacity(10)
+        site_filter.add('1', 2, 'T')
+        
+        variants = open_individual(person, site_filter=site_filter)
+        self.assertEqual([ x.get_key() for x in variants ], [('1', 2)])
+    
+    def test_open_individual_with_gene_intervals(self):
+        ''' test that open_individual() skips lines outside known gene spans
+        '''
+        
+        vcf = make_vcf_header()
+        vcf.append(make_vcf_line(pos=1, extra='HGNC=ATRX;MAX_AF=0.0001'))
+        vcf.append(make_vcf_line(pos=150, extra='HGNC=ATRX;MAX_AF=0.0001'))
+        vcf.append(make_vcf_line(pos=300, extra='HGNC=ATRX;MAX_AF=0.0001'))
+        
+        path = os.path.join(self.temp_dir, "temp.vcf")
+        write_temp_vcf(path, vcf)
+        
+        person = Person('fam_id', 'sample', 'dad', 'mom', 'F', '2', path)
+        
+        known = {'ATRX': {'chrom': 'chr1', 'start': 100, 'end': 200}}
+        intervals = GeneIntervals(known)
+        
+        variants = open_individual(person, gene_intervals=intervals)
+        self.assertEqual([ x.get_key() for x in variants ], [('1', 150)])
+        
+        # the cursor is reset, so we can reuse the intervals for another VCF
+        variants = open_individual(person, gene_intervals=intervals)
+        self.assertEqual([ x.get_key() for x in variants ], [('1', 150)])
+    
     def test_open_individual_with_mnvs(self):
         ''' test that open_individual works with MNVs
         '''
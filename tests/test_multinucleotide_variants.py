@@ -31,7 +31,7 @@ import tabix
 
 from clinicalfilter.utils import open_vcf, exclude_header
 from clinicalfilter.multinucleotide_variants import get_mnv_candidates, \
-    find_nearby_variants, parse_vcf_line, get_matches, is_not_indel, is_coding, \
+    scan_mnvs, find_nearby_variants, parse_vcf_line, get_matches, is_not_indel, is_coding, \
     screen_pairs, same_aa, translate, get_codons, check_mnv_consequence
 
 from tests.utils import make_vcf_header, make_vcf_line
@@ -124,6 +124,25 @@ class TestMNVChecksPy(unittest.TestCase):
         self.assertEqual(get_mnv_candidates(self.path), {
             ('1', 1): 'alternate_residue_mnv', ('1', 2): 'alternate_residue_mnv'})
     
+    def test_get_mnv_candidates_uncompressed(self):
+        ''' check that get_mnv_candidates works without a tabix index
+        '''
+        
+        lines = make_vcf_header()
+        lines.append(make_vcf_line(chrom='1', pos=1, extra='Protein_position=1;Codons=aaT/aaG'))
+        lines.append(make_vcf_line(chrom='1', pos=2, extra='Protein_position=1;Codons=Aat/Cat'))
+        
+        path = os.path.join(self.tempdir, 'uncompressed.vcf')
+        with open(path, 'w') as handle:
+            handle.writelines(lines)
+        
+        expected = {('1', 1): 'alternate_residue_mnv',
+            ('1', 2): 'alternate_residue_mnv'}
+        self.assertEqual(get_mnv_candidates(path), expected)
+        
+        # regions are ignored without an index, since we read the full VCF
+        self.assertEqual(get_mnv_candidates(path, [('1', 1, 1)]), expected)
+    
     def test_get_mnv_candidates_catch_assertion_error(self):
         ''' check that get_mnv_candidates works correctly
         '''
@@ -135,6 +154,67 @@ class TestMNVChecksPy(unittest.TestCase):
         
         self.assertEqual(get_mnv_candidates(self.path), {})
     
+    def test_scan_mnvs(self):
+        ''' check that scan_mnvs() finds MNVs within the VCF stream
+        '''
+        
+        lines = []
+        lines.append(make_vcf_line(chrom='1', pos=1, extra='Protein_position=1;Codons=aaT/aaG'))
+        lines.append(make_vcf_line(chrom='1', pos=2, extra='Protein_position=1;Codons=Aat/Cat'))
+        lines.append(make_vcf_line(chrom='1', pos=10, extra='Protein_position=5;Codons=Aat/Cat'))
+        
+        mnvs = {}
+        self.assertEqual(list(scan_mnvs(lines, mnvs)), lines)
+        self.assertEqual(mnvs, {('1', 1): 'alternate_residue_mnv',
+            ('1', 2): 'alternate_residue_mnv'})
+        
+        # lines are yielded once their MNV codes are known
+        mnvs = {}
+        for line in scan_mnvs(lines, mnvs):
+            chrom, pos = line.split('\t')[:2]
+            if int(pos) < 10:
+                self.assertIn((chrom, int(pos)), mnvs)
+    
+    def test_scan_mnvs_screened(self):
+        ''' check that scan_mnvs() excludes pairs which fail the MNV checks
+        '''
+        
+        # pairs in different amino acids
+        lines = [make_vcf_line(pos=1, extra='Protein_position=1;Codons=aaT/aaG'),
+            make_vcf_line(pos=2, extra='Protein_position=2;Codons=Att/Ctt')]
+        mnvs = {}
+        self.assertEqual(list(scan_mnvs(lines, mnvs)), lines)
+        self.assertEqual(mnvs, {})
+        
+        # pairs including an indel
+        lines = [make_vcf_line(pos=1, extra='Protein_position=1;Codons=aaT/aaG'),
+            make_vcf_line(pos=2, alts='GT', extra='Protein_position=1;Codons=Aat/Cat')]
+        mnvs = {}
+        self.assertEqual(list(scan_mnvs(lines, mnvs)), lines)
+        self.assertEqual(mnvs, {})
+        
+        # pairs with a noncoding partner
+        lines = [make_vcf_line(pos=1, extra='Protein_position=1;Codons=aaT/aaG'),
+            make_vcf_line(pos=2, cq='intron_variant', extra='Protein_position=1;Codons=Aat/Cat')]
+        mnvs = {}
+        self.assertEqual(list(scan_mnvs(lines, mnvs)), lines)
+        self.assertEqual(mnvs, {})
+        
+        # pairs with an extra variant at one of the positions
+        lines = [make_vcf_line(pos=1, extra='Protein_position=1;Codons=aaT/aaG'),
+            make_vcf_line(pos=2, extra='Protein_position=1;Codons=Aat/Cat'),
+            make_vcf_line(pos=2, alts='C', extra='Protein_position=1;Codons=Aat/Cat')]
+        mnvs = {}
+        self.assertEqual(list(scan_mnvs(lines, mnvs)), lines)
+        self.assertEqual(mnvs, {})
+        
+        # variants on different chromosomes
+        lines = [make_vcf_line(chrom='1', pos=1, extra='Protein_position=1;Codons=aaT/aaG'),
+            make_vcf_line(chrom='2', pos=2, extra='Protein_position=1;Codons=Aat/Cat')]
+        mnvs = {}
+        self.assertEqual(list(scan_mnvs(lines, mnvs)), lines)
+        self.assertEqual(mnvs, {})
+    
     def test_find_nearby_variants(self):
         ''' test that find_nearby_variants() works correctly
         '''
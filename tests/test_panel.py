@@ -0,0 +1,113 @@
+'''
+Copyright (c) 2017 Genome Research Ltd.
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of
+this software and associated documentation files (the "Software"), to deal in
+the Software without restriction, including without limitation the rights to
+use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies
+of the Software, and to permit persons to whom the Software is furnished to do
+so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+'''
+
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from clinicalfilter.panel import merge_regions, open_panel
+
+class TestPanelPy(unittest.TestCase):
+    ''' test loading gene panels
+    '''
+    
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = tempfile.mkdtemp()
+    
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.temp_dir)
+    
+    def setUp(self):
+        self.known = {
+            'HGNC:1': {'symbol': 'ATRX', 'chrom': 'X', 'start': 500, 'end': 600},
+            'HGNC:2': {'symbol': 'ARID1B', 'chrom': '6', 'start': 100, 'end': 200},
+            'HGNC:3': {'symbol': 'KMT2A', 'chrom': '6', 'start': 150, 'end': 300},
+            }
+    
+    def write_panel(self, lines):
+        path = os.path.join(self.temp_dir, 'panel.txt')
+        with open(path, 'w') as handle:
+            handle.writelines(lines)
+        
+        return path
+    
+    def test_merge_regions(self):
+        ''' check regions are sorted, and overlapping regions are merged
+        '''
+        
+        regions = [('6', 150, 300), ('1', 10, 20), ('6', 100, 200),
+            ('6', 301, 400), ('6', 500, 600)]
+        self.assertEqual(merge_regions(regions),
+            [('1', 10, 20), ('6', 100, 400), ('6', 500, 600)])
+    
+    def test_open_panel_genes(self):
+        ''' check gene lists are converted to regions via the known genes
+        '''
+        
+        path = self.write_panel(['ATRX\n', 'HGNC:2\n', '\n', '# comment\n'])
+        panel = open_panel(path, self.known)
+        
+        self.assertEqual(panel.genes, set(['HGNC:1', 'HGNC:2']))
+        self.assertEqual(panel.regions, [('6', 100, 200), ('X', 500, 600)])
+        
+        # the known genes are restricted to the panel genes
+        known = panel.restrict_genes(self.known)
+        self.assertEqual(sorted(known), ['HGNC:1', 'HGNC:2'])
+        
+        # genes missing from the known genes are skipped, unless the panel has
+        # no genes left
+        path = self.write_panel(['ATRX\n', 'UNKNOWN\n'])
+        self.assertEqual(open_panel(path, self.known).genes, set(['HGNC:1']))
+        
+        path = self.write_panel(['UNKNOWN\n'])
+        with self.assertRaises(ValueError):
+            open_panel(path, self.known)
+        
+        # gene lists need known genes for their coordinates
+        with self.assertRaises(ValueError):
+            open_panel(path, None)
+    
+    def test_open_panel_bed(self):
+        ''' check BED regions are loaded as 1-based regions
+        '''
+        
+        path = self.write_panel(['track name=panel\n', '6\t99\t200\tARID1B\n',
+            '6\t149\t300\n'])
+        panel = open_panel(path)
+        
+        self.assertIsNone(panel.genes)
+        self.assertEqual(panel.regions, [('6', 100, 300)])
+        self.assertEqual(panel.restrict_genes(self.known), self.known)
+        
+        # we can't mix BED regions and gene names
+        path = self.write_panel(['6\t99\t200\n', 'ATRX\n'])
+        with self.assertRaises(ValueError):
+            open_panel(path, self.known)
+    
+    def test_open_panel_none(self):
+        ''' check we get None without a panel
+        '''
+        
+        self.assertIsNone(open_panel(None, self.known))
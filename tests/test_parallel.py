@@ -0,0 +1,152 @@
+'''
+Copyright (c) 2017 Genome Research Ltd.
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of
+this software and associated documentation files (the "Software"), to deal in
+the Software without restriction, including without limitation the rights to
+use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies
+of the Software, and to permit persons to whom the Software is furnished to do
+so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+'''
+
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from clinicalfilter.filter import Filter
+from clinicalfilter.parallel import run_families, run_pipeline, read_family
+from clinicalfilter.ped import Family, Person
+
+from tests.utils import make_vcf_header, make_vcf_line, write_temp_vcf
+
+class TestParallelPy(unittest.TestCase):
+    ''' test analysing families in worker processes
+    '''
+    
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = tempfile.mkdtemp()
+    
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.temp_dir)
+    
+    def make_family(self, fam_id, gene):
+        ''' make a trio with a de novo in the child
+        '''
+        
+        paths = {}
+        for member in ['child', 'mom', 'dad']:
+            geno, pp_dnm = '0/0', ''
+            if member == 'child':
+                geno, pp_dnm = '0/1', ';DENOVO-SNP;PP_DNM=1'
+            
+            vcf = make_vcf_header()
+            vcf.append(make_vcf_line(genotype=geno, extra='HGNC={}{}'.format(gene, pp_dnm)))
+            paths[member] = os.path.join(self.temp_dir, '{}.{}.vcf'.format(fam_id, member))
+            write_temp_vcf(paths[member], vcf)
+        
+        child = Person(fam_id, fam_id + 'child', 'dad', 'mom', 'female', '2', paths['child'])
+        mom = Person(fam_id, 'mom', '0', '0', 'female', '1', paths['mom'])
+        dad = Person(fam_id, 'dad', '0', '0', 'male', '1', paths['dad'])
+        
+        return Family(fam_id, [child], mom, dad)
+    
+    def test_run_families(self):
+        ''' check parallel runs give the same output as serial runs, in order
+        '''
+        
+        genes = ['ARID1B', 'ATRX', 'KMT2A', 'SETD5']
+        
+        serial = os.path.join(self.temp_dir, 'serial.txt')
+        options = {'population_tags': ['MAX_AF'], 'pp_filter': 0.9,
+            'output_path': serial}
+        finder = Filter(**options)
+        for i, gene in enumerate(genes):
+            finder.filter_trio(self.make_family('fam{}'.format(i), gene))
+        
+        parallel = os.path.join(self.temp_dir, 'parallel.txt')
+        options['output_path'] = parallel
+        finder = Filter(**options)
+        families = [ self.make_family('fam{}'.format(i), x) for i, x in enumerate(genes) ]
+        failed = run_families(finder, families, options, workers=2)
+        
+        self.assertEqual(failed, [])
+        with open(serial) as handle:
+            expected = handle.readlines()
+        with open(parallel) as handle:
+            self.assertEqual(handle.readlines(), expected)
+        self.assertEqual(len(expected), len(genes) + 1)
+    
+    def test_run_families_failure(self):
+        ''' check a failed family is reported, without stopping the run
+        '''
+        
+        path = os.path.join(self.temp_dir, 'output.txt')
+        options = {'population_tags': ['MAX_AF'], 'pp_filter': 0.9,
+            'output_path': path}
+        finder = Filter(**options)
+        
+        families = [ self.make_family('fam{}'.format(i), 'ARID1B') for i in range(3) ]
+        families[1].children[0].vcf_path = os.path.join(self.temp_dir, 'missing.vcf')
+        
+        failed = run_families(finder, families, options, workers=2)
+        
+        self.assertEqual([ x[0] for x in failed ], ['fam1'])
+        self.assertIn('VCF not found', failed[0][1])
+        
+        with open(path) as handle:
+            probands = [ x.split('\t')[0] for x in handle.readlines()[1:] ]
+        self.assertEqual(probands, ['fam0child', 'fam2child'])
+    
+    def test_run_pipeline(self):
+        ''' check the pipeline gives the same output as serial runs, in order
+        '''
+        
+        genes = ['ARID1B', 'ATRX', 'KMT2A', 'SETD5', 'ANKRD11']
+        
+        serial = os.path.join(self.temp_dir, 'serial.txt')
+        options = {'population_tags': ['MAX_AF'], 'pp_filter': 0.9,
+            'output_path': serial}
+        finder = Filter(**options)
+        for i, gene in enumerate(genes):
+            finder.filter_trio(self.make_family('fam{}'.format(i), gene))
+        
+        path = os.path.join(self.temp_dir, 'pipeline.txt')
+        options['output_path'] = path
+        finder = Filter(**options)
+        families = [ self.make_family('fam{}'.format(i), x) for i, x in enumerate(genes) ]
+        families[2].children[0].vcf_path = os.path.join(self.temp_dir, 'missing.vcf')
+        
+        failed = run_pipeline(finder, families, options, workers=2, readers=2,
+            prefetch=1)
+        
+        self.assertEqual([ x[0] for x in failed ], ['fam2'])
+        with open(serial) as handle:
+            expected = handle.readlines()
+        del expected[3]
+        with open(path) as handle:
+            self.assertEqual(handle.readlines(), expected)
+    
+    def test_read_family(self):
+        ''' check the VCFs for a family are read without their headers
+        '''
+        
+        family = self.make_family('fam', 'ARID1B')
+        sources = read_family(family)
+        
+        self.assertEqual(sorted(sources), sorted([ x.get_path() for x in family ]))
+        self.assertEqual(sources[family.children[0].get_path()],
+            make_vcf_line(genotype='0/1', extra='HGNC=ARID1B;DENOVO-SNP;PP_DNM=1'))
@@ -0,0 +1,138 @@
+'''
+Copyright (c) 2017 Genome Research Ltd.
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of
+this software and associated documentation files (the "Software"), to deal in
+the Software without restriction, including without limitation the rights to
+use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies
+of the Software, and to permit persons to whom the Software is furnished to do
+so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+'''
+
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from clinicalfilter.variant.info import Info
+from clinicalfilter.site_annotations import SiteAnnotation, annotate_site, \
+    get_polyphen_class, build_site_annotations, open_site_annotations, \
+    LOF, MISSENSE, SYNONYMOUS
+
+from tests.utils import make_vcf_header, make_vcf_line, write_temp_vcf
+
+class TestSiteAnnotationsPy(unittest.TestCase):
+    ''' test the site annotation index
+    '''
+    
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = tempfile.mkdtemp()
+    
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.temp_dir)
+    
+    def tearDown(self):
+        Info.populations = []
+        Info.last_base = set()
+    
+    def test_annotate_site(self):
+        ''' check that annotate_site() works correctly
+        '''
+        
+        Info.set_populations(['AFR_AF', 'EUR_AF'])
+        info = 'CQ=missense_variant|synonymous_variant;HGNC_ID=1001|1002;' \
+            'AFR_AF=0.01;EUR_AF=0.001;PolyPhen=benign(0.01)|probably_damaging(0.99)'
+        
+        self.assertEqual(annotate_site('1', 100, ('G',), info),
+            SiteAnnotation(MISSENSE | SYNONYMOUS, ('1001', '1002'), 0.01,
+                'probably_damaging'))
+        
+        # check that multiallelic sites merge the annotation across alleles
+        info = 'CQ=stop_gained,synonymous_variant;HGNC_ID=1001,1003'
+        self.assertEqual(annotate_site('1', 100, ('G', 'T'), info),
+            SiteAnnotation(LOF | SYNONYMOUS, ('1001', '1003'), None, None))
+    
+    def test_annotate_site_last_base(self):
+        ''' check that annotate_site() uses the last base sites
+        '''
+        
+        Info.set_last_base_sites(set([('1', 100)]))
+        info = 'CQ=splice_region_variant;HGNC_ID=1001'
+        
+        self.assertEqual(annotate_site('1', 100, ('G',), info).consequence, LOF)
+        self.assertEqual(annotate_site('1', 101, ('G',), info).consequence, 0)
+    
+    def test_get_polyphen_class(self):
+        ''' check that get_polyphen_class() works correctly
+        '''
+        
+        self.assertIsNone(get_polyphen_class(Info('CQ=missense_variant')))
+        self.assertEqual(get_polyphen_class(Info('PolyPhen=benign(0.01)')), 'benign')
+        self.assertEqual(get_polyphen_class(Info('PolyPhen=benign(0.01)|'
+            'possibly_damaging(0.6),unknown(0)')), 'possibly_damaging')
+    
+    def test_can_pass(self):
+        ''' check that SiteAnnotation.can_pass() works correctly
+        '''
+        
+        site = SiteAnnotation(MISSENSE, ('1001', ), 0.001, None)
+        self.assertTrue(site.can_pass())
+        self.assertTrue(site.can_pass({'1001': {}}))
+        
+        # sites outside the known genes fail
+        self.assertFalse(site.can_pass({'1002': {}}))
+        
+        # sites which are too common, or nonfunctional fail
+        self.assertFalse(site._replace(max_af=0.01).can_pass())
+        self.assertFalse(site._replace(consequence=SYNONYMOUS).can_pass())
+        self.assertTrue(site._replace(consequence=LOF | SYNONYMOUS).can_pass())
+    
+    def test_build_and_open_site_annotations(self):
+        ''' check we can build the site annotations, then load them again
+        '''
+        
+        vcf_1 = make_vcf_header() + [make_vcf_line(pos=100, extra='HGNC_ID=1001'),
+            make_vcf_line(pos=200, cq='synonymous_variant', extra='AFR_AF=0.1')]
+        vcf_2 = make_vcf_header() + [make_vcf_line(pos=100, extra='HGNC_ID=1001'),
+            make_vcf_line(pos=300, alts='C,T', cq='stop_gained,missense_variant')]
+        
+        paths = []
+        for i, lines in enumerate([vcf_1, vcf_2]):
+            path = os.path.join(self.temp_dir, 'sample_{}.vcf'.format(i))
+            write_temp_vcf(path, lines)
+            paths.append(path)
+        
+        output = os.path.join(self.temp_dir, 'sites.txt.gz')
+        self.assertEqual(build_site_annotations(paths, output, ['AFR_AF']), 3)
+        
+        self.assertEqual(open_site_annotations(output, ['AFR_AF']), {
+            ('1', 100, 'G', 'T'): SiteAnnotation(MISSENSE, ('1001', ), None, None),
+            ('1', 200, 'G', 'T'): SiteAnnotation(SYNONYMOUS, (), 0.1, None),
+            ('1', 300, 'G', 'C,T'): SiteAnnotation(LOF | MISSENSE, (), None, None)})
+        
+        # loading without a path gives None
+        self.assertIsNone(open_site_annotations(None))
+        
+        # we cannot use the annotations with different populations
+        with self.assertRaises(ValueError):
+            open_site_annotations(output, ['EUR_AF'])
+        
+        # or with a different last base sites file
+        lof_sites = os.path.join(self.temp_dir, 'last_base.json')
+        with open(lof_sites, 'w') as handle:
+            handle.write('[["1", 100]]')
+        with self.assertRaises(ValueError):
+            open_site_annotations(output, ['AFR_AF'], lof_sites)
@@ -0,0 +1,146 @@
+'''
+Copyright (c) 2017 Genome Research Ltd.
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of
+this software and associated documentation files (the "Software"), to deal in
+the Software without restriction, including without limitation the rights to
+use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies
+of the Software, and to permit persons to whom the Software is furnished to do
+so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+'''
+
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from clinicalfilter.variant.info import Info
+from clinicalfilter.site_annotations import build_site_annotations
+from clinicalfilter.site_filter import SiteFilter, build_site_filter, \
+    open_site_filter
+
+from tests.utils import make_vcf_header, make_vcf_line, write_temp_vcf
+
+class TestSiteFilterPy(unittest.TestCase):
+    ''' test the SiteFilter class, and building the filter for a cohort
+    '''
+    
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = tempfile.mkdtemp()
+    
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.temp_dir)
+    
+    def tearDown(self):
+        Info.populations = []
+        Info.last_base = set()
+    
+    def test_for_capacity(self):
+        ''' check the filter is sized for the capacity and error rate
+        '''
+        
+        site_filter = SiteFilter.for_capacity(1000, 0.01)
+        self.assertEqual(site_filter.bits, 9586)
+        self.assertEqual(site_filter.hashes, 7)
+        self.assertEqual(len(site_filter.data), 1199)
+        
+        # an empty cohort still gives a usable filter
+        site_filter = SiteFilter.for_capacity(0)
+        self.assertFalse(('1', 100, 'A') in site_filter)
+    
+    def test_contains(self):
+        ''' check that added sites are found in the filter
+        '''
+        
+        site_filter = SiteFilter.for_capacity(100)
+        site_filter.add('1', 100, 'A')
+        site_filter.add('X', '2000', 'C,T')
+        
+        self.assertTrue(('1', 100, 'A') in site_filter)
+        self.assertTrue(('1', '100', 'A') in site_filter)
+        self.assertTrue(('X', 2000, 'C,T') in site_filter)
+        self.assertFalse(('1', 100, 'G') in site_filter)
+        self.assertFalse(('2', 100, 'A') in site_filter)
+    
+    def test_might_pass(self):
+        ''' check that might_pass() works on unsplit VCF lines
+        '''
+        
+        site_filter = SiteFilter.for_capacity(100)
+        site_filter.add('1', 100, 'T')
+        
+        self.assertTrue(site_filter.might_pass(make_vcf_line(pos=100)))
+        self.assertFalse(site_filter.might_pass(make_vcf_line(pos=200)))
+        
+        # CNVs and MNV candidates are always parsed
+        self.assertTrue(site_filter.might_pass(make_vcf_line(pos=200, alts='<DEL>')))
+        self.assertTrue(site_filter.might_pass(make_vcf_line(pos=200),
+            {('1', 200): 'modified_protein_altering_mnv'}))
+    
+    def test_write_and_read(self):
+        ''' check that we can write a filter to disk and read it back
+        '''
+        
+        site_filter = SiteFilter.for_capacity(100)
+        site_filter.add('1', 100, 'A')
+        site_filter.metadata = {'populations': 'AFR_AF'}
+        
+        path = os.path.join(self.temp_dir, 'filter.bin')
+        site_filter.write(path)
+        
+        loaded = SiteFilter.read(path)
+        self.assertEqual(loaded.bits, site_filter.bits)
+        self.assertEqual(loaded.hashes, site_filter.hashes)
+        self.assertEqual(loaded.data, site_filter.data)
+        self.assertEqual(loaded.metadata, {'populations': 'AFR_AF'})
+    
+    def test_build_site_filter(self):
+        ''' check that we can build a filter from the site annotations
+        '''
+        
+        vcf = make_vcf_header() + [make_vcf_line(pos=100, extra='HGNC_ID=1001'),
+            make_vcf_line(pos=200, cq='synonymous_variant', extra='HGNC_ID=1001'),
+            make_vcf_line(pos=300, extra='HGNC_ID=1002'),
+            make_vcf_line(pos=400, extra='HGNC_ID=1001;AFR_AF=0.1')]
+        vcf_path = os.path.join(self.temp_dir, 'sample.vcf')
+        write_temp_vcf(vcf_path, vcf)
+        
+        sites_path = os.path.join(self.temp_dir, 'sites.txt.gz')
+        build_site_annotations([vcf_path], sites_path, ['AFR_AF'])
+        
+        genes_path = os.path.join(self.temp_dir, 'genes.txt')
+        with open(genes_path, 'w') as handle:
+            handle.write('gene\tchr\tstart\tstop\ttype\tmode\tmech\thgnc_id\n')
+            handle.write('TEST\t1\t1\t1000\tconfirmed dd gene\tMonoallelic\t'
+                'Loss-of-function\t1001\n')
+        
+        output = os.path.join(self.temp_dir, 'filter.bin')
+        self.assertEqual(build_site_filter(sites_path, output, genes_path,
+            ['AFR_AF']), 1)
+        
+        site_filter = open_site_filter(output, genes_path, ['AFR_AF'])
+        self.assertTrue(('1', 100, 'T') in site_filter)
+        self.assertFalse(('1', 200, 'T') in site_filter)
+        self.assertFalse(('1', 300, 'T') in site_filter)
+        self.assertFalse(('1', 400, 'T') in site_filter)
+        
+        self.assertIsNone(open_site_filter(None))
+        
+        # the filter can't be used with other known genes, or populations
+        with self.assertRaises(ValueError):
+            open_site_filter(output, None, ['AFR_AF'])
+        with self.assertRaises(ValueError):
+            open_site_filter(output, genes_path, ['EUR_AF'])
@@ -32,12 +32,12 @@ import tempfile
 from clinicalfilter.variant.snv import SNV
 from clinicalfilter.variant.cnv import CNV
 from clinicalfilter.utils import open_vcf, get_vcf_header, exclude_header, \
-    construct_variant, get_vcf_provenance
+    construct_variant, get_vcf_provenance, fetch_regions
 from clinicalfilter.ped import Family, Person
 
 IS_PYTHON3 = sys.version_info.major == 3
 
-from tests.utils import make_minimal_vcf
+from tests.utils import make_minimal_vcf, make_vcf_header, make_vcf_line
 from tests.utils import write_temp_vcf, write_gzipped_vcf
 
 class TestUtilsPy(unittest.TestCase):
@@ -179,6 +179,39 @@ class TestUtilsPy(unittest.TestCase):
         provenance = get_vcf_provenance(family.father)
         self.assertEqual(provenance, ('NA', 'NA', 'NA'))
     
+    def test_fetch_regions(self):
+        """ check that fetch_regions() reads only lines within the regions
+        """
+        
+        vcf = make_vcf_header()
+        vcf.append(make_vcf_line(pos=100))
+        vcf.append(make_vcf_line(pos=200))
+        vcf.append(make_vcf_line(pos=300, alts='<DEL>', extra='END=1000'))
+        vcf.append(make_vcf_line(pos=2000))
+        
+        path = os.path.join(self.temp_dir, "temp.vcf.gz")
+        write_gzipped_vcf(path, vcf)
+        
+        # the CNV overlaps both regions, but is only included once
+        regions = [('1', 150, 350), ('1', 500, 600)]
+        self.assertEqual(list(fetch_regions(path, regions)), vcf[5:7])
+        
+        # regions include their start and end positions
+        regions = [('1', 100, 100), ('1', 2000, 2000)]
+        self.assertEqual(list(fetch_regions(path, regions)),
+            [vcf[4], vcf[7]])
+        
+        # chromosomes can differ by a 'chr' prefix, and missing chromosomes
+        # are skipped
+        regions = [('chr1', 100, 100), ('2', 100, 100)]
+        self.assertEqual(list(fetch_regions(path, regions)), [vcf[4]])
+        
+        # VCFs without an index raise an error
+        path = os.path.join(self.temp_dir, "temp.vcf")
+        write_temp_vcf(path, vcf)
+        with self.assertRaises(ValueError):
+            list(fetch_regions(path, regions))
+    
     def test_construct_variant(self):
         """ test that construct_variant() works correctly
         """
@@ -0,0 +1,132 @@
+'''
+Copyright (c) 2017 Genome Research Ltd.
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of
+this software and associated documentation files (the "Software"), to deal in
+the Software without restriction, including without limitation the rights to
+use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies
+of the Software, and to permit persons to whom the Software is furnished to do
+so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+'''
+
+
+import unittest
+
+from clinicalfilter.variant.annotation_cache import AnnotationCache
+from clinicalfilter.variant.info import Info
+from clinicalfilter.variant.snv import SNV
+from clinicalfilter.variant.cnv import CNV
+
+from tests.utils import create_snv, create_cnv
+
+class TestAnnotationCachePy(unittest.TestCase):
+    ''' test the AnnotationCache class
+    '''
+    
+    def tearDown(self):
+        Info.set_cache(None)
+        Info.populations = []
+        Info.last_base = set()
+    
+    def test_lru_eviction(self):
+        ''' check that the least recently used entries are evicted
+        '''
+        
+        cache = AnnotationCache(max_size=2)
+        cache.add('a', {})
+        cache.add('b', {})
+        
+        # use the first entry, so the second is the least recently used
+        self.assertEqual(cache.get('a'), {'info': {}, 'derived': {}, 'max_af': {}})
+        cache.add('c', {})
+        
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.evictions, 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertIsNotNone(cache.get('c'))
+    
+    def test_hit_rate(self):
+        ''' check that the hit rate statistics are tracked
+        '''
+        
+        cache = AnnotationCache()
+        self.assertEqual(cache.hit_rate(), 0.0)
+        
+        cache.get('a')
+        cache.add('a', {})
+        cache.get('a')
+        cache.get('a')
+        cache.get('b')
+        
+        self.assertEqual(cache.hits, 2)
+        self.assertEqual(cache.misses, 2)
+        self.assertEqual(cache.hit_rate(), 0.5)
+        self.assertEqual(cache.stats(), 'annotation cache: 1 entries, 2 hits, '
+            '2 misses, 0 evictions, hit rate 0.500')
+    
+    def test_shared_annotations(self):
+        ''' check that variants at the same site share the parsed annotation
+        '''
+        
+        cache = AnnotationCache()
+        Info.set_cache(cache)
+        Info.set_populations(['AFR_AF'])
+        
+        first = create_snv('F', '0/1', extra_info='AFR_AF=0.001')
+        second = create_snv('M', '1/1', extra_info='AFR_AF=0.001')
+        
+        self.assertEqual(cache.hits, 1)
+        self.assertEqual(cache.misses, 1)
+        self.assertEqual(second.info.info, first.info.info)
+        self.assertEqual(second.info.get_genes(), [['1001']])
+        self.assertEqual(second.info.consequence, [['missense_variant']])
+        self.assertEqual(first.info.find_max_allele_frequency(), 0.001)
+        self.assertEqual(second.info.find_max_allele_frequency(), 0.001)
+        
+        # check that modifying the INFO of one variant doesn't alter the other
+        second.info['ClinicalFilterType'] = 'single_variant'
+        self.assertNotIn('ClinicalFilterType', first.info)
+        
+        # a different INFO at the same site is a different cache entry
+        create_snv('F', '0/1', extra_info='AFR_AF=0.01')
+        self.assertEqual(cache.misses, 2)
+    
+    def test_cache_cleared_for_new_last_base_sites(self):
+        ''' check that changing the last base sites drops cached consequences
+        '''
+        
+        cache = AnnotationCache()
+        Info.set_cache(cache)
+        create_snv('F', '0/1', cq='splice_region_variant')
+        
+        Info.set_last_base_sites(set([('1', 150)]))
+        self.assertEqual(len(cache), 0)
+        
+        var = create_snv('F', '0/1', cq='splice_region_variant')
+        self.assertEqual(var.info.consequence, [['conserved_exon_terminus_variant']])
+        
+        # setting the same sites again keeps the cached entries
+        Info.set_last_base_sites(set([('1', 150)]))
+        self.assertEqual(len(cache), 1)
+    
+    def test_cnvs_not_cached(self):
+        ''' check that CNV annotations are not shared
+        '''
+        
+        cache = AnnotationCache()
+        Info.set_cache(cache)
+        create_cnv('F', 'unknown')
+        create_cnv('F', 'unknown')
+        
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.hits, 0)